@@ -12,6 +12,13 @@ let isTracking = false;
 let lastNotificationTime = 0;
 const NOTIFICATION_COOLDOWN = 30000; // 30 seconds
 
+// Position fixes are buffered and sent to /api/behavior/batch together
+let pendingFixes = [];
+let fixFlushTimer = null;
+let anonymousTrackingId = null;
+const FIX_BATCH_SIZE = 10;
+const FIX_FLUSH_INTERVAL = 15000; // 15 seconds
+
 // Authentication variables
 let currentUser = null;
 let verificationCode = null;
@@ -37,6 +44,10 @@ function initMap() {
 
     // Add click event for rating
     map.on('click', onMapClick);
+
+    // Rating markers are aggregated per view, so reload them when it changes
+    map.on('moveend', loadRatings);
+    map.on('moveend', connectEventStream);
 }
 
 // Get user's current location
@@ -121,7 +132,9 @@ function onMapClick(e) {
 // Load ratings from server
 async function loadRatings() {
     try {
-        const response = await fetch('/api/ratings');
+        const bounds = map.getBounds();
+        const bbox = [bounds.getWest(), bounds.getSouth(), bounds.getEast(), bounds.getNorth()].join(',');
+        const response = await fetch(`/api/ratings?bbox=${bbox}&zoom=${map.getZoom()}`);
         const data = await response.json();
 
         // Clear existing markers
@@ -130,12 +143,12 @@ async function loadRatings() {
         });
         ratingMarkers = [];
 
-        // Add proximity-grouped rating markers
+        // Add area-aggregated rating markers
         data.forEach(rating => {
             const marker = L.marker([rating.lat, rating.lng]).addTo(map)
                 .bindPopup(`<div style="text-align: center;">
                     <strong>Safety Rating: ${rating.rating} ⭐</strong><br>
-                    <small>Based on ${rating.count} reviews within 5km area</small><br>
+                    <small>Based on ${rating.count} reviews in this area</small><br>
                     <em>Click map to rate this area</em>
                 </div>`);
 
@@ -167,28 +180,95 @@ async function loadHotspots() {
         hotspotMarkers = [];
 
         // Add hotspot markers
-        data.hotspots.forEach(hotspot => {
-            // Create a custom icon for hotspots
-            const hotspotIcon = L.divIcon({
-                html: `<div style="background: linear-gradient(135deg, #ff6b6b, #ee5a24); border-radius: 50%; width: 40px; height: 40px; display: flex; align-items: center; justify-content: center; color: white; font-weight: bold; font-size: 14px; border: 3px solid white; box-shadow: 0 2px 10px rgba(0,0,0,0.3);">${hotspot.tourist_count}</div>`,
-                className: 'hotspot-marker',
-                iconSize: [40, 40],
-                iconAnchor: [20, 20]
-            });
+        data.hotspots.forEach(addHotspotMarker);
+    } catch (error) {
+        console.error('Error loading hotspots:', error);
+    }
+}
 
-            const marker = L.marker([hotspot.lat, hotspot.lng], {icon: hotspotIcon}).addTo(map)
-                .bindPopup(createHotspotPopup(hotspot));
+function addHotspotMarker(hotspot) {
+    // Create a custom icon for hotspots
+    const hotspotIcon = L.divIcon({
+        html: `<div style="background: linear-gradient(135deg, #ff6b6b, #ee5a24); border-radius: 50%; width: 40px; height: 40px; display: flex; align-items: center; justify-content: center; color: white; font-weight: bold; font-size: 14px; border: 3px solid white; box-shadow: 0 2px 10px rgba(0,0,0,0.3);">${hotspot.tourist_count}</div>`,
+        className: 'hotspot-marker',
+        iconSize: [40, 40],
+        iconAnchor: [20, 20]
+    });
 
-            hotspotMarkers.push({
-                id: hotspot.id,
-                lat: hotspot.lat,
-                lng: hotspot.lng,
-                tourist_count: hotspot.tourist_count,
-                marker: marker
+    const marker = L.marker([hotspot.lat, hotspot.lng], {icon: hotspotIcon}).addTo(map)
+        .bindPopup(createHotspotPopup(hotspot));
+
+    hotspotMarkers.push({
+        id: hotspot.id,
+        lat: hotspot.lat,
+        lng: hotspot.lng,
+        tourist_count: hotspot.tourist_count,
+        marker: marker
+    });
+}
+
+function removeHotspotMarker(hotspotId) {
+    hotspotMarkers = hotspotMarkers.filter(hotspot => {
+        if (hotspot.id === hotspotId) {
+            map.removeLayer(hotspot.marker);
+            return false;
+        }
+        return true;
+    });
+}
+
+// Live updates over server-sent events, limited to the area around the map view
+let eventSource = null;
+let streamArea = null;
+
+function viewArea() {
+    const center = map.getCenter();
+    const radiusKm = map.distance(center, map.getBounds().getNorthEast()) / 1000;
+    // Subscribe a bit wider than the view so small pans keep the same stream
+    return { lat: center.lat, lng: center.lng, radius: radiusKm * 2 };
+}
+
+function connectEventStream() {
+    const view = viewArea();
+    if (eventSource && streamArea) {
+        const offsetKm = map.distance([streamArea.lat, streamArea.lng], [view.lat, view.lng]) / 1000;
+        if (offsetKm + view.radius / 2 <= streamArea.radius) {
+            return; // The view is still inside the subscribed area
+        }
+        eventSource.close();
+    }
+
+    streamArea = view;
+    eventSource = new EventSource(
+        `/api/stream?lat=${view.lat.toFixed(4)}&lng=${view.lng.toFixed(4)}&radius=${view.radius.toFixed(1)}`);
+    eventSource.addEventListener('hotspot', e => applyHotspotChange(JSON.parse(e.data)));
+    eventSource.addEventListener('alert', e => showLiveAlert(JSON.parse(e.data)));
+    // We fell behind and missed events, or just (re)connected: resync over REST
+    eventSource.addEventListener('dropped', loadHotspots);
+    eventSource.onopen = loadHotspots;
+}
+
+function applyHotspotChange(change) {
+    removeHotspotMarker(change.hotspot.id);
+    if (change.action !== 'dissolved') {
+        addHotspotMarker(change.hotspot);
+    }
+}
+
+function showLiveAlert(alert) {
+    const now = Date.now();
+    if (alert.type === 'sos' || now - lastNotificationTime > NOTIFICATION_COOLDOWN) {
+        lastNotificationTime = now;
+        if ('Notification' in window && Notification.permission === 'granted') {
+            new Notification(alert.type === 'sos' ? '🚨 SOS Alert' : 'Safety Alert', {
+                body: alert.message
             });
-        });
-    } catch (error) {
-        console.error('Error loading hotspots:', error);
+        }
+    }
+
+    // Keep the dashboard's recent alerts current while it is open
+    if (document.getElementById('sidebar').classList.contains('open')) {
+        loadDashboard();
     }
 }
 
@@ -227,8 +307,6 @@ async function joinHotspot(hotspotId) {
 
         if (data.success) {
             alert(data.message);
-            // Refresh hotspots to show updated count
-            loadHotspots();
 
             // Show notification
             if (Notification.permission === 'granted') {
@@ -795,40 +873,14 @@ function startLiveTracking() {
                     console.error('Error fetching tracking ratings:', error);
                 });
 
-            // Send behavior data to server
-            if (currentUser) {
-                fetch('/api/behavior', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({
-                        user_id: currentUser.id,
-                        lat: lat,
-                        lng: lng,
-                        name: currentUser.name
-                    })
-                }).catch(error => console.error('Behavior update error:', error));
-            } else {
-                // Send anonymous location data for hotspot detection
-                fetch('/api/behavior', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({
-                        user_id: 'anonymous_' + Date.now(),
-                        lat: lat,
-                        lng: lng,
-                        name: 'Anonymous Tourist'
-                    })
-                }).catch(error => console.error('Anonymous behavior update error:', error));
-            }
+            // Queue behavior data for the server; the first fix goes out straight away
+            queueFix(lat, lng);
 
             // Fetch location info for live tracking (only once when tracking starts)
             if (!window.locationInfoFetched) {
                 fetchLocationInfo(lat, lng);
                 window.locationInfoFetched = true;
             }
-
-            // Refresh hotspots after location update
-            setTimeout(() => loadHotspots(), 1000);
         },
         (error) => {
             console.error('Tracking error:', error);
@@ -849,9 +901,60 @@ function stopLiveTracking() {
         watchId = null;
     }
     isTracking = false;
+    flushFixes();
     updateTrackingUI();
 }
 
+function queueFix(lat, lng) {
+    const firstFix = fixFlushTimer === null && pendingFixes.length === 0;
+    pendingFixes.push({ lat: lat, lng: lng, timestamp: new Date().toISOString() });
+
+    if (firstFix || pendingFixes.length >= FIX_BATCH_SIZE) {
+        flushFixes();
+    } else if (fixFlushTimer === null) {
+        fixFlushTimer = setTimeout(flushFixes, FIX_FLUSH_INTERVAL);
+    }
+}
+
+function fixBatch() {
+    if (!currentUser && !anonymousTrackingId) {
+        // One id per page session so anonymous fixes stay one tourist
+        anonymousTrackingId = 'anonymous_' + Date.now();
+    }
+    const batch = {
+        user_id: currentUser ? currentUser.id : anonymousTrackingId,
+        name: currentUser ? currentUser.name : 'Anonymous Tourist',
+        fixes: pendingFixes
+    };
+    pendingFixes = [];
+    if (fixFlushTimer !== null) {
+        clearTimeout(fixFlushTimer);
+        fixFlushTimer = null;
+    }
+    return batch;
+}
+
+function flushFixes() {
+    if (pendingFixes.length === 0) {
+        return;
+    }
+    fetch('/api/behavior/batch', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(fixBatch())
+    })
+        .then(() => setTimeout(() => loadHotspots(), 1000)) // Refresh hotspots after location update
+        .catch(error => console.error('Behavior update error:', error));
+}
+
+// Don't lose buffered fixes when the page goes away
+window.addEventListener('pagehide', () => {
+    if (pendingFixes.length > 0) {
+        navigator.sendBeacon('/api/behavior/batch',
+            new Blob([JSON.stringify(fixBatch())], { type: 'application/json' }));
+    }
+});
+
 function updateTrackingUI() {
     const button = document.getElementById('live-tracking-btn');
     const status = document.getElementById('tracking-status');
@@ -912,11 +1015,9 @@ document.addEventListener('DOMContentLoaded', async () => {
     // Load ratings
     await loadRatings();
 
-    // Load hotspots
+    // Load hotspots, then follow changes as they are streamed
     await loadHotspots();
-
-    // Refresh hotspots every 30 seconds
-    setInterval(loadHotspots, 30000);
+    connectEventStream();
 });
 
 // Authentication Functions
@@ -1063,7 +1164,7 @@ function updateDashboardUI(data) {
     } else {
         alertsDiv.innerHTML = data.recent_alerts.map(alert => `
             <div class="alert-item ${alert.type === 'sos' ? 'danger' : ''}">
-                <strong>${alert.type.toUpperCase()}</strong><br>
+                <strong>${alert.type.toUpperCase()}</strong>${alert.hits > 1 ? ` ×${alert.hits}` : ''}<br>
                 ${alert.message.substring(0, 100)}...<br>
                 <small>${new Date(alert.timestamp).toLocaleString()}</small>
             </div>
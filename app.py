@@ -1,32 +1,1131 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, Response
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urlsplit
 import json
 import os
 import random
 from datetime import datetime, timedelta
 import secrets
+import math
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+import numpy as np
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # Rating radius queries fall back to a linear vectorized scan
+    cKDTree = None
+from werkzeug.datastructures import Headers
 from werkzeug.security import generate_password_hash, check_password_hash
 import hashlib
+import re
+import unicodedata
+import sqlite3
+import atexit
+import click
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 
 app = Flask(__name__)
 app.secret_key = secrets.token_hex(16)
 
 # Configuration
-WEATHER_API_URL = "https://api.open-meteo.com/v1/forecast"
-NOMINATIM_API_URL = "https://nominatim.openstreetmap.org/search"
-
-# In-memory storage (replace with database in production)
-users = {}
-ratings = []
-alerts = []
-behavior_history = {}
+WEATHER_API_URL = os.environ.get('WEATHER_API_URL', "https://api.open-meteo.com/v1/forecast")
+NOMINATIM_API_URL = os.environ.get('NOMINATIM_API_URL', "https://nominatim.openstreetmap.org/search")
+TRACKING_TTL_SECONDS = int(os.environ.get('TRACKING_TTL_SECONDS', 30 * 60))  # Forget tourists unseen this long
+TRACKING_MAX_USERS = int(os.environ.get('TRACKING_MAX_USERS', 100000))  # Hard cap on tracked users
+RATING_TILE_LEVELS = (3, 6, 9, 12, 15)  # Zoom levels with precomputed rating aggregates
+RATING_DEFAULT_ZOOM = 10  # Map zoom assumed when /api/ratings gets no zoom
+UPSTREAM_TIMEOUT = 5  # Seconds to wait on external APIs
+UPSTREAM_POOL_SIZE = int(os.environ.get('UPSTREAM_POOL_SIZE', 20))  # Keep-alive connections kept per host
+UPSTREAM_HOST_CONCURRENCY = int(os.environ.get('UPSTREAM_HOST_CONCURRENCY', 10))  # In-flight requests per host
+UPSTREAM_RETRIES = int(os.environ.get('UPSTREAM_RETRIES', 2))
+USER_AGENT = 'Tourist-Safety-Portal/1.0'
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')  # Share caches through Redis instead of per process
+TRACKING_REDIS_URL = os.environ.get('TRACKING_REDIS_URL')  # Share live tracking and hotspots between workers
+WEATHER_CACHE_TTL_SECONDS = int(os.environ.get('WEATHER_CACHE_TTL_SECONDS', 600))
+WEATHER_CACHE_SIZE = int(os.environ.get('WEATHER_CACHE_SIZE', 4096))
+WEATHER_CACHE_GRID_DEG = float(os.environ.get('WEATHER_CACHE_GRID_DEG', 0.01))  # ~1km cells share a forecast
+WIKI_CACHE_PATH = os.environ.get('WIKI_CACHE_PATH', os.path.join(app.instance_path, 'wiki_cache.sqlite3'))
+WIKI_CACHE_TTL_SECONDS = int(os.environ.get('WIKI_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+WIKI_CACHE_STALE_SECONDS = int(os.environ.get('WIKI_CACHE_STALE_SECONDS', 90 * 24 * 3600))  # Served while refreshing
+WIKI_ATTRACTIONS_DEADLINE = float(os.environ.get('WIKI_ATTRACTIONS_DEADLINE', 6.0))  # Seconds for all attraction searches
+UPSTREAM_WORKERS = int(os.environ.get('UPSTREAM_WORKERS', 32))  # Threads for concurrent upstream calls
+WIKI_SEARCH_DEADLINE = float(os.environ.get('WIKI_SEARCH_DEADLINE', 1.5))  # Seconds /api/search waits on Wikipedia
+GEOCODE_CACHE_TTL_SECONDS = int(os.environ.get('GEOCODE_CACHE_TTL_SECONDS', 24 * 3600))
+GEOCODE_NOT_FOUND_TTL_SECONDS = int(os.environ.get('GEOCODE_NOT_FOUND_TTL_SECONDS', 600))
+GEOCODE_CACHE_SIZE = int(os.environ.get('GEOCODE_CACHE_SIZE', 10000))
+NOMINATIM_MIN_INTERVAL = float(os.environ.get('NOMINATIM_MIN_INTERVAL', 1.0))  # Nominatim policy: max 1 req/s
+NOMINATIM_MAX_QUEUE_SECONDS = float(os.environ.get('NOMINATIM_MAX_QUEUE_SECONDS', 10.0))  # Longest wait for a slot
+BEHAVIOR_HISTORY_SIZE = 50  # Recent fixes kept per tourist
+BEHAVIOR_BATCH_MAX_FIXES = int(os.environ.get('BEHAVIOR_BATCH_MAX_FIXES', 1000))  # Per /api/behavior/batch request
+STREAM_QUEUE_SIZE = int(os.environ.get('STREAM_QUEUE_SIZE', 100))  # Events held for a slow streaming client
+STREAM_KEEPALIVE_SECONDS = float(os.environ.get('STREAM_KEEPALIVE_SECONDS', 15.0))
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'sqlite')  # 'sqlite' or 'memory'
+STORAGE_PATH = os.environ.get('STORAGE_PATH', os.path.join(app.instance_path, 'trip_maker.sqlite3'))
+STORAGE_BATCH_SIZE = int(os.environ.get('STORAGE_BATCH_SIZE', 256))  # Queued writes that trigger an early flush
+STORAGE_FLUSH_SECONDS = float(os.environ.get('STORAGE_FLUSH_SECONDS', 0.2))  # Longest a queued write waits
+ALERT_RECENT_SIZE = int(os.environ.get('ALERT_RECENT_SIZE', 1000))  # Alerts kept in memory per process
+ALERT_RETENTION_DAYS = int(os.environ.get('ALERT_RETENTION_DAYS', 90))  # Alert history kept on disk
+ALERT_CELL_DEGREES = 0.1  # Alert location index cell, about 11km
+ALERT_PAGE_SIZE = 20
+ALERT_PAGE_MAX = 100
+ALERT_LEGACY_SIZE = 10  # Alerts in the bare list /api/alerts returns without paging params
+ALERT_DEDUP_SECONDS = int(os.environ.get('ALERT_DEDUP_SECONDS', 600))  # Repeats of an alert in one cell coalesce this long
+ALERT_DEDUP_MAX_KEYS = int(os.environ.get('ALERT_DEDUP_MAX_KEYS', 10000))
+TREND_MINUTES = int(os.environ.get('TREND_MINUTES', 60))  # Per-minute dashboard buckets kept
+TREND_HOURS = int(os.environ.get('TREND_HOURS', 48))  # Per-hour dashboard buckets kept
+REFERENCE_CACHE_SIZE = int(os.environ.get('REFERENCE_CACHE_SIZE', 4096))  # Serialized language responses kept
+REFERENCE_MAX_AGE = int(os.environ.get('REFERENCE_MAX_AGE', 3600))  # Browser cache lifetime for them, in seconds
+
+class ExpiringStore:
+    """Key-value store that forgets keys not seen for `ttl` seconds.
+
+    Keys are kept in last-seen order, so expiry only ever looks at the
+    oldest entries, and the store never holds more than `max_entries`.
+    """
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # {key: (last_seen, value)}
+        self.lock = threading.RLock()
+        self.expired = 0
+        self.evicted = 0
+
+    def set(self, key, value):
+        """Store a value as seen now and return any (key, value) pushed out by the size cap"""
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (time.time(), value)
+
+            dropped = []
+            while len(self.entries) > self.max_entries:
+                old_key, (_, old_value) = self.entries.popitem(last=False)
+                dropped.append((old_key, old_value))
+            self.evicted += len(dropped)
+            return dropped
+
+    def expire(self, now=None):
+        """Drop entries older than the ttl and return them as (key, value) pairs"""
+        cutoff = (now or time.time()) - self.ttl
+        dropped = []
+        with self.lock:
+            while self.entries:
+                key, (seen, value) = next(iter(self.entries.items()))
+                if seen >= cutoff:
+                    break
+                del self.entries[key]
+                dropped.append((key, value))
+            self.expired += len(dropped)
+        return dropped
+
+    def get(self, key, default=None):
+        entry = self.entries.get(key)
+        return entry[1] if entry is not None else default
+
+    def __getitem__(self, key):
+        return self.entries[key][1]
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def values(self):
+        with self.lock:
+            return [value for _, value in self.entries.values()]
+
+    def stats(self):
+        return {
+            'size': len(self.entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'expired': self.expired,
+            'evicted': self.evicted
+        }
+
+class PositionRing:
+    """Fixed-capacity ring buffer of one tourist's recent fixes.
+
+    Rows of a single (capacity, 3) float64 array hold lat, lng and epoch
+    seconds; once full, each append overwrites the oldest fix in place.
+    """
+
+    __slots__ = ('data', 'start', 'size')
+
+    def __init__(self, capacity):
+        self.data = np.empty((capacity, 3), dtype=np.float64)
+        self.start = 0
+        self.size = 0
+
+    def append(self, lat, lng, epoch):
+        capacity = len(self.data)
+        self.data[(self.start + self.size) % capacity] = (lat, lng, epoch)
+        if self.size < capacity:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % capacity
+
+    def __len__(self):
+        return self.size
+
+class BehaviorStore(ExpiringStore):
+    """ExpiringStore of PositionRings that keeps a running total of stored fixes"""
+
+    def __init__(self, ttl, max_entries, capacity):
+        super().__init__(ttl, max_entries)
+        self.capacity = capacity
+        self.total_positions = 0
+
+    def record(self, key, fixes):
+        """Append (lat, lng, epoch) fixes to a tourist's ring and mark them as seen now"""
+        with self.lock:
+            history = self.get(key)
+            if history is None:
+                history = PositionRing(self.capacity)
+            before = len(history)
+            for lat, lng, epoch in fixes:
+                history.append(lat, lng, epoch)
+            self.total_positions += len(history) - before
+
+            dropped = self.set(key, history)
+            self.total_positions -= sum(len(old) for _, old in dropped)
+            return dropped
+
+    def expire(self, now=None):
+        with self.lock:
+            dropped = super().expire(now)
+            self.total_positions -= sum(len(old) for _, old in dropped)
+            return dropped
+
+class RedisTrackingStore:
+    """ExpiringStore counterpart that keeps entries in Redis, shared by every worker.
+
+    Values live as JSON in a hash, and a sorted set scored by last-seen
+    time gives expiry and the size cap the same oldest-first order.
+    """
+
+    def __init__(self, client, prefix, ttl, max_entries):
+        self.client = client
+        self.values_key = f"{prefix}values"
+        self.seen_key = f"{prefix}seen"
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.expired = 0
+        self.evicted = 0
+
+    def set(self, key, value):
+        """Store a value as seen now and return any (key, value) pushed out by the size cap"""
+        pipe = self.client.pipeline()
+        pipe.hset(self.values_key, key, json.dumps(value))
+        pipe.zadd(self.seen_key, {key: time.time()})
+        pipe.zcard(self.seen_key)
+        size = pipe.execute()[-1]
+
+        if size <= self.max_entries:
+            return []
+        oldest = [member for member, _ in self.client.zpopmin(self.seen_key, size - self.max_entries)]
+        dropped = self._pop_values(oldest)
+        self.evicted += len(dropped)
+        return dropped
+
+    def expire(self, now=None):
+        """Drop entries older than the ttl and return them as (key, value) pairs"""
+        cutoff = (now or time.time()) - self.ttl
+        stale = self.client.zrangebyscore(self.seen_key, '-inf', f"({cutoff}")
+        if not stale:
+            return []
+        self.client.zrem(self.seen_key, *stale)
+        dropped = self._pop_values(stale)
+        self.expired += len(dropped)
+        return dropped
+
+    def _pop_values(self, keys):
+        if not keys:
+            return []
+        pipe = self.client.pipeline()
+        pipe.hmget(self.values_key, keys)
+        pipe.hdel(self.values_key, *keys)
+        values = pipe.execute()[0]
+        return [(key, json.loads(value)) for key, value in zip(keys, values) if value is not None]
+
+    def get(self, key, default=None):
+        value = self.client.hget(self.values_key, key)
+        return json.loads(value) if value is not None else default
+
+    def __getitem__(self, key):
+        value = self.client.hget(self.values_key, key)
+        if value is None:
+            raise KeyError(key)
+        return json.loads(value)
+
+    def __contains__(self, key):
+        return bool(self.client.hexists(self.values_key, key))
+
+    def __len__(self):
+        return self.client.hlen(self.values_key)
+
+    def values(self):
+        return [json.loads(value) for value in self.client.hvals(self.values_key)]
+
+    def stats(self):
+        return {
+            'backend': 'redis',
+            'size': len(self),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'expired': self.expired,
+            'evicted': self.evicted
+        }
+
+class RatingStore:
+    """Append-only columnar storage for safety ratings.
+
+    Coordinates, scores and epoch timestamps live in parallel NumPy arrays
+    that double in capacity when full, so radius queries and aggregates
+    run as vectorized scans instead of walking a list of dicts.
+
+    Radius queries go through a k-d tree over the ratings' unit-sphere
+    positions. New ratings are scanned directly until enough of them pile
+    up to make rebuilding the tree worthwhile.
+
+    Running totals for the dashboard are kept up to date on append.
+    """
+
+    REBUILD_MIN_PENDING = 1024
+    LOW_SCORE = 3  # Below this a rating marks a low-safety zone
+    HIGH_SCORE = 4  # From this up it marks a high-safety zone
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.score_sum = 0
+        self.low_count = 0
+        self.high_count = 0
+        self.lock = threading.Lock()
+        self.index_lock = threading.Lock()
+        self._tree = None
+        self._indexed = 0  # Ratings [0, _indexed) are in the tree
+        self._lat = np.empty(capacity, dtype=np.float64)
+        self._lng = np.empty(capacity, dtype=np.float64)
+        self._rating = np.empty(capacity, dtype=np.uint8)
+        self._timestamp = np.empty(capacity, dtype=np.int64)
+
+    def append(self, lat, lng, rating, timestamp=None):
+        timestamp = int(time.time()) if timestamp is None else int(timestamp)
+        with self.lock:
+            if self.size == len(self._lat):
+                self._grow()
+            index = self.size
+            self._lat[index] = lat
+            self._lng[index] = lng
+            self._rating[index] = rating
+            self._timestamp[index] = timestamp
+            self.size += 1
+            self.score_sum += rating
+            if rating < self.LOW_SCORE:
+                self.low_count += 1
+            elif rating >= self.HIGH_SCORE:
+                self.high_count += 1
+
+    def summary(self):
+        """(count, average score, low-safety count, high-safety count) without a scan"""
+        with self.lock:
+            size, score_sum, low, high = self.size, self.score_sum, self.low_count, self.high_count
+        return size, (score_sum / size if size else 0), low, high
+
+    def _grow(self):
+        capacity = len(self._lat) * 2
+        for name in ('_lat', '_lng', '_rating', '_timestamp'):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    @property
+    def scores(self):
+        return self._rating[:self.size]
+
+    def columns(self):
+        """Consistent (lats, lngs, scores, timestamps) views of every stored rating"""
+        with self.lock:
+            size = self.size
+            return self._lat[:size], self._lng[:size], self._rating[:size], self._timestamp[:size]
+
+    def within(self, lat, lng, radius_km):
+        """Indices of the ratings within radius_km of a point"""
+        if cKDTree is None:
+            lats, lngs, _, _ = self.columns()
+            return np.flatnonzero(haversine_km(lat, lng, lats, lngs) <= radius_km)
+
+        # Take the columns after the tree, so they cover every rating it indexed
+        tree, indexed = self._current_tree(len(self))
+        lats, lngs, _, _ = self.columns()
+        found = np.empty(0, dtype=np.intp)
+        if tree is not None:
+            # Great-circle radius converted to a straight-line chord on the unit sphere
+            chord = 2 * math.sin(min(radius_km / EARTH_RADIUS_KM, math.pi) / 2)
+            found = np.asarray(tree.query_ball_point(unit_vectors(lat, lng), chord), dtype=np.intp)
+            found = found[haversine_km(lat, lng, lats[found], lngs[found]) <= radius_km]
+
+        pending = indexed + np.flatnonzero(
+            haversine_km(lat, lng, lats[indexed:], lngs[indexed:]) <= radius_km
+        )
+        return np.concatenate((found, pending))
+
+    def _current_tree(self, size):
+        """Return the k-d tree and how many ratings it covers, rebuilding when stale"""
+        with self.index_lock:
+            pending = size - self._indexed
+            if pending > max(self.REBUILD_MIN_PENDING, self._indexed // 4):
+                self._tree = cKDTree(unit_vectors(self._lat[:size], self._lng[:size]))
+                self._indexed = size
+            return self._tree, self._indexed
+
+    def __len__(self):
+        return self.size
+
+class RatingTiles:
+    """Per-cell rating aggregates at several map zoom levels.
+
+    Cells are Web Mercator tiles. Each keeps a count and the sums of scores
+    and coordinates, so the map overlay is served straight from aggregates
+    and a new rating only touches one cell per level.
+    """
+
+    MAX_LATITUDE = 85.05112878  # Web Mercator cut-off
+
+    def __init__(self, levels):
+        self.levels = sorted(levels)
+        self.cells = {level: {} for level in self.levels}  # {level: {(x, y): [count, score_sum, lat_sum, lng_sum]}}
+        self.lock = threading.Lock()
+
+    def tile(self, lat, lng, level):
+        """Web Mercator tile (x, y) containing a point"""
+        tiles = 1 << level
+        lat_rad = math.radians(max(-self.MAX_LATITUDE, min(self.MAX_LATITUDE, lat)))
+        x = int((lng + 180) / 360 * tiles)
+        y = int((1 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2 * tiles)
+        return min(max(x, 0), tiles - 1), min(max(y, 0), tiles - 1)
+
+    def add(self, lat, lng, score):
+        with self.lock:
+            for level in self.levels:
+                cell = self.cells[level].setdefault(self.tile(lat, lng, level), [0, 0, 0.0, 0.0])
+                cell[0] += 1
+                cell[1] += score
+                cell[2] += lat
+                cell[3] += lng
+
+    def level_for_zoom(self, zoom):
+        """Finest level whose cells are still a few map tiles' worth of markers apart"""
+        usable = [level for level in self.levels if level <= zoom + 2]
+        return usable[-1] if usable else self.levels[0]
+
+    def query(self, zoom, west=-180.0, south=-90.0, east=180.0, north=90.0):
+        """Aggregated cells at a zoom level that fall inside a bounding box"""
+        level = self.level_for_zoom(zoom)
+        tiles = 1 << level
+        # Map bounds can run past +/-180 when the view wraps around the world
+        if east - west >= 360:
+            west, east = -180.0, 180.0
+        else:
+            west = (west + 180) % 360 - 180
+            east = (east + 180) % 360 - 180
+        min_x, max_y = self.tile(south, west, level)
+        max_x, min_y = self.tile(north, east, level)
+        # A box crossing the antimeridian wraps around to the start of the row
+        if west <= east:
+            x_ranges = [(min_x, max_x)]
+        else:
+            x_ranges = [(min_x, tiles - 1), (0, max_x)]
+
+        cells = self.cells[level]
+        with self.lock:
+            visible = sum(hi - lo + 1 for lo, hi in x_ranges) * (max_y - min_y + 1)
+            if visible <= len(cells):
+                keys = [(x, y) for lo, hi in x_ranges for x in range(lo, hi + 1)
+                        for y in range(min_y, max_y + 1) if (x, y) in cells]
+            else:
+                keys = [(x, y) for x, y in cells
+                        if min_y <= y <= max_y and any(lo <= x <= hi for lo, hi in x_ranges)]
+
+            result = []
+            for x, y in keys:
+                count, score_sum, lat_sum, lng_sum = cells[(x, y)]
+                result.append({
+                    'id': f"{level}/{x}/{y}",
+                    'lat': lat_sum / count,
+                    'lng': lng_sum / count,
+                    'rating': round(score_sum / count, 1),
+                    'count': count
+                })
+            return result
+
+def parse_position(value):
+    """(lat, lng) from a {'lat', 'lng'} dict or a "lat, lng" string, else (None, None)"""
+    try:
+        if isinstance(value, dict):
+            return float(value['lat']), float(value['lng'])
+        if isinstance(value, str):
+            lat, lng = value.split(',')
+            return float(lat), float(lng)
+    except (KeyError, TypeError, ValueError):
+        pass
+    return None, None
+
+def alert_position(alert):
+    """Where an alert happened: an SOS location or a weather report's coordinates"""
+    data = alert.get('data') if isinstance(alert.get('data'), dict) else {}
+    return parse_position(alert.get('location') or data.get('weather', {}).get('coordinates'))
+
+ALERT_CELL_COLUMNS = math.ceil(360 / ALERT_CELL_DEGREES)
+
+def alert_cell(lat, lng):
+    """Location index cell of a position, or None when it has none"""
+    if lat is None or lng is None:
+        return None
+    row = math.floor((min(max(lat, -90.0), 90.0) + 90) / ALERT_CELL_DEGREES)
+    column = math.floor(((lng + 180) % 360) / ALERT_CELL_DEGREES)
+    return row * ALERT_CELL_COLUMNS + column
+
+def area_cell_ranges(area, max_ranges=400):
+    """(first, last) index cell runs covering a (lat, lng, radius_km) area, one or two per row.
+
+    Returns None when the area is too big for the cell index to help.
+    """
+    lat, lng, radius = area
+    lat_span = radius / 111.0
+    lng_span = radius / (111.0 * max(math.cos(math.radians(min(abs(lat) + lat_span, 89.0))), 0.01))
+    rows = range(math.floor((max(lat - lat_span, -90.0) + 90) / ALERT_CELL_DEGREES),
+                 math.floor((min(lat + lat_span, 90.0) + 90) / ALERT_CELL_DEGREES) + 1)
+    if 2 * lng_span >= 360 or len(rows) > max_ranges // 2:
+        return None
+
+    first = math.floor(((lng - lng_span + 180) % 360) / ALERT_CELL_DEGREES)
+    last = math.floor(((lng + lng_span + 180) % 360) / ALERT_CELL_DEGREES)
+    # An area across the antimeridian wraps around to the first columns
+    columns = [(first, last)] if first <= last else [(first, ALERT_CELL_COLUMNS - 1), (0, last)]
+    return [(row * ALERT_CELL_COLUMNS + lo, row * ALERT_CELL_COLUMNS + hi)
+            for row in rows for lo, hi in columns]
+
+class AlertQuery:
+    """Filters for an alert history lookup; every field is optional"""
+
+    def __init__(self, types=None, since=None, until=None, area=None):
+        self.types = set(types) if types else None
+        self.since = since  # Epoch seconds, inclusive
+        self.until = until  # Epoch seconds, exclusive
+        self.area = area  # (lat, lng, radius_km)
+
+    def __bool__(self):
+        return bool(self.types or self.since is not None or self.until is not None or self.area)
+
+    def matches(self, alert_type, ts, lat, lng):
+        if self.types and alert_type not in self.types:
+            return False
+        if self.since is not None and (ts is None or ts < self.since):
+            return False
+        if self.until is not None and (ts is None or ts >= self.until):
+            return False
+        return self.in_area(lat, lng)
+
+    def in_area(self, lat, lng):
+        if not self.area:
+            return True
+        return lat is not None and calculate_distance(self.area[0], self.area[1], lat, lng) <= self.area[2]
+
+def alert_fields(alert):
+    """(epoch seconds, lat, lng) an alert is indexed under"""
+    try:
+        ts = datetime.fromisoformat(alert['timestamp']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        ts = None
+    lat, lng = alert_position(alert)
+    return ts, lat, lng
+
+class AlertRing:
+    """The most recent alerts with their index fields, oldest dropped first"""
+
+    def __init__(self, capacity):
+        self.entries = deque(maxlen=capacity)  # (alert_id, ts, lat, lng, alert)
+        self.lock = threading.Lock()
+
+    def append(self, alert, alert_id=None):
+        ts, lat, lng = alert_fields(alert)
+        with self.lock:
+            self.entries.append((alert_id, ts, lat, lng, alert))
+
+    def recent(self, limit):
+        with self.lock:
+            return [entry[4] for entry in itertools.islice(reversed(self.entries), limit)][::-1]
+
+    def query(self, query, before=None, limit=ALERT_PAGE_SIZE):
+        """Newest-first page of (alert_id, alert) older than `before`"""
+        with self.lock:
+            entries = list(self.entries)
+        page = []
+        for alert_id, ts, lat, lng, alert in reversed(entries):
+            if before is not None and alert_id >= before:
+                continue
+            if query.matches(alert['type'], ts, lat, lng):
+                page.append((alert_id, alert))
+                if len(page) == limit:
+                    break
+        return page
+
+    def __len__(self):
+        return len(self.entries)
+
+class AlertDeduper:
+    """Coalesces repeats of an alert in the same place into one entry.
+
+    The first alert for a (key, location cell, time window) is logged as
+    usual; repeats inside the window only bump its 'hits' count. Counts are
+    written back when they reach a power of two and when the window closes,
+    so a storm seen by thousands of users costs a handful of writes.
+    """
+
+    def __init__(self, window, max_entries):
+        self.window = window
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # {(key, cell, window_index): [alert, hits_written]}, oldest window first
+        self.lock = threading.Lock()
+        self.coalesced = 0
+
+    def admit(self, key, alert, now=None):
+        """Open an entry for `alert` or count it against the open one.
+
+        Returns (new, changed): whether `alert` should be logged, and the
+        logged alerts whose hit counts need writing back.
+        """
+        slot = int((now or time.time()) // self.window)
+        entry_key = (key, alert_cell(*alert_position(alert)), slot)
+        with self.lock:
+            changed = self._close(slot, self.max_entries)
+            entry = self.entries.get(entry_key)
+            if entry is None:
+                alert['hits'] = 1
+                self.entries[entry_key] = [alert, 1]
+                return True, changed
+
+            open_alert = entry[0]
+            open_alert['hits'] += 1
+            self.coalesced += 1
+            hits = open_alert['hits']
+            if hits & (hits - 1) == 0:
+                entry[1] = hits
+                changed.append(open_alert)
+        return False, changed
+
+    def close_expired(self, now=None):
+        """Close entries whose window has ended; returns the alerts whose hit counts need writing back"""
+        slot = int((now or time.time()) // self.window)
+        with self.lock:
+            return self._close(slot, math.inf)
+
+    def close_all(self):
+        """Close every open entry, e.g. at shutdown"""
+        with self.lock:
+            return self._close(math.inf, math.inf)
+
+    def _close(self, slot, limit):
+        # Close windows before `slot`, and the oldest entries while there are `limit` or more
+        changed = []
+        while self.entries:
+            (_, _, oldest_slot), (old_alert, written) = next(iter(self.entries.items()))
+            if oldest_slot >= slot and len(self.entries) < limit:
+                break
+            self.entries.popitem(last=False)
+            if old_alert['hits'] != written:
+                changed.append(old_alert)
+        return changed
+
+    def stats(self):
+        return {'open': len(self.entries), 'window_seconds': self.window, 'coalesced': self.coalesced}
+
+class MemoryStorage:
+    """Keeps accounts and alerts in process memory; everything is lost on restart.
+
+    Only the newest `alert_capacity` alerts are kept.
+
+    Ratings live only in the in-memory RatingStore, so there is nothing to
+    record or sync for them here.
+    """
+
+    def __init__(self, alert_capacity):
+        self.lock = threading.Lock()
+        self.users = {}  # {email: user}
+        self.verification_codes = {}  # {email: code}
+        self.blockchain_hashes = {}  # {user_id: hash}
+        self.verified_count = 0
+        self.alerts = AlertRing(alert_capacity)  # The whole alert history
+        self.alert_ids = itertools.count(1)
+
+    def add_user(self, email, name, password, created_at):
+        """Create an unverified user, or return None if the email is taken"""
+        with self.lock:
+            if email in self.users:
+                return None
+            user = {
+                'id': str(len(self.users) + 1),
+                'name': name,
+                'email': email,
+                'password': password,
+                'verified': False,
+                'created_at': created_at
+            }
+            self.users[email] = user
+            return dict(user)
+
+    def get_user(self, email):
+        with self.lock:
+            user = self.users.get(email)
+            return dict(user) if user else None
+
+    def set_user_verified(self, email):
+        with self.lock:
+            user = self.users[email]
+            if not user['verified']:
+                user['verified'] = True
+                self.verified_count += 1
+
+    def count_verified_users(self):
+        return self.verified_count
+
+    def set_verification_code(self, email, code):
+        with self.lock:
+            self.verification_codes[email] = code
+
+    def get_verification_code(self, email):
+        with self.lock:
+            return self.verification_codes.get(email)
+
+    def delete_verification_code(self, email):
+        with self.lock:
+            self.verification_codes.pop(email, None)
+
+    def get_blockchain_hash(self, user_id):
+        with self.lock:
+            return self.blockchain_hashes.get(user_id)
+
+    def set_blockchain_hash(self, user_id, value):
+        with self.lock:
+            self.blockchain_hashes[user_id] = value
+
+    def add_rating(self, lat, lng, rating, timestamp):
+        pass
+
+    def new_ratings(self):
+        return []
+
+    def add_alert(self, alert):
+        self.alerts.append(alert, next(self.alert_ids))
+
+    def update_alert(self, alert):
+        pass  # The ring holds the alert itself, so it is already current
+
+    def recent_alerts(self, limit):
+        return self.alerts.recent(limit)
+
+    def query_alerts(self, query, before=None, limit=ALERT_PAGE_SIZE):
+        """Newest-first page of (alert_id, alert) matching `query`, older than `before`"""
+        return self.alerts.query(query, before, limit)
+
+    def flush(self):
+        pass
+
+    def stats(self):
+        with self.lock:
+            users = len(self.users)
+        return {'backend': 'memory', 'users': users, 'alerts': len(self.alerts)}
+
+class AlertRow:
+    """Database id of a queued alert, known once its insert is flushed"""
+
+    __slots__ = ('alert', 'id')
+
+    def __init__(self, alert):
+        self.alert = alert
+        self.id = None
+
+class SQLiteStorage:
+    """Accounts, ratings and alerts in an SQLite database shared by all workers.
+
+    The database runs in WAL mode so gunicorn workers can read while one
+    of them writes. Account changes are committed straight away; ratings and
+    alerts are queued and written in batches by a background thread, at
+    most `flush_seconds` after they arrive.
+
+    Each process tags the ratings it writes, so new_ratings() hands back
+    only the rows other workers added since the last call.
+
+    The alerts table is the append-only alert history, indexed by type, time
+    and location cell, and pruned after `retention_days`. The newest alerts
+    from every worker are also kept in an AlertRing, so the dashboard never
+    has to wait on a flush.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT NOT NULL UNIQUE,
+            name TEXT NOT NULL,
+            password TEXT NOT NULL,
+            verified INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS verification_codes (
+            email TEXT PRIMARY KEY,
+            code TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS blockchain_hashes (
+            user_id TEXT PRIMARY KEY,
+            hash TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS ratings (
+            id INTEGER PRIMARY KEY,
+            lat REAL NOT NULL,
+            lng REAL NOT NULL,
+            rating INTEGER NOT NULL,
+            timestamp INTEGER NOT NULL,
+            writer TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS ratings_location ON ratings (lat, lng);
+        CREATE TABLE IF NOT EXISTS alerts (
+            id INTEGER PRIMARY KEY,
+            type TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            alert TEXT NOT NULL
+        );
+    """
+
+    # Added to the alerts table after its first release
+    ALERT_COLUMNS = (('ts', 'REAL'), ('cell', 'INTEGER'), ('writer', 'TEXT'))
+
+    INDEXES = """
+        CREATE INDEX IF NOT EXISTS alerts_type ON alerts (type, id);
+        CREATE INDEX IF NOT EXISTS alerts_ts ON alerts (ts);
+        CREATE INDEX IF NOT EXISTS alerts_cell ON alerts (cell, id);
+    """
+
+    def __init__(self, path, batch_size, flush_seconds, alert_capacity, retention_days, tracked_alerts):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.retention = retention_days * 86400
+        self.writer = secrets.token_hex(8)  # Tags this process's ratings and alerts
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript(self.SCHEMA)
+        columns = {row[1] for row in self.db.execute('PRAGMA table_info(alerts)')}
+        for column, kind in self.ALERT_COLUMNS:
+            if column not in columns:
+                self.db.execute(f'ALTER TABLE alerts ADD COLUMN {column} {kind}')
+        if 'ts' not in columns:
+            self._index_old_alerts()
+        self.db.executescript(self.INDEXES)
+        # Counters start from a one-off count over databases that predate them
+        self.db.execute("INSERT OR IGNORE INTO counters (name, value) "
+                        "SELECT 'verified_users', COUNT(*) FROM users WHERE verified = 1")
+        self.db.commit()
+        self.lock = threading.Lock()
+        self.pending_lock = threading.Lock()
+        self.pending = []  # [(sql, params, AlertRow or None)] awaiting the next batch, in queue order
+        self.tracked_alerts = tracked_alerts
+        self.alert_rows = OrderedDict()  # {id(alert): AlertRow} for alerts whose hits may be rewritten
+        self.ratings_cursor = 0  # Highest rating id handed out by new_ratings()
+        self.alerts = AlertRing(alert_capacity)
+        rows = self.db.execute('SELECT id, alert FROM alerts ORDER BY id DESC LIMIT ?', (alert_capacity,)).fetchall()
+        for _, alert in reversed(rows):
+            self.alerts.append(json.loads(alert))
+        self.alerts_cursor = rows[0][0] if rows else 0  # Highest alert id folded into the ring
+        self.pruned_at = 0
+        self.wake = threading.Event()
+        threading.Thread(target=self._flush_loop, name='storage-writer', daemon=True).start()
+        atexit.register(self.flush)
+
+    def _index_old_alerts(self):
+        """Fill in ts and cell for alerts written before those columns existed"""
+        rows = self.db.execute('SELECT id, timestamp, alert FROM alerts WHERE ts IS NULL').fetchall()
+        fields = []
+        for alert_id, timestamp, alert in rows:
+            try:
+                alert = json.loads(alert)
+                alert.setdefault('timestamp', timestamp)
+                ts, lat, lng = alert_fields(alert)
+            except (AttributeError, TypeError, ValueError):
+                continue
+            fields.append((ts, alert_cell(lat, lng), alert_id))
+        self.db.executemany('UPDATE alerts SET ts = ?, cell = ? WHERE id = ?', fields)
+        self.db.commit()
+
+    def _user(self, row):
+        if row is None:
+            return None
+        user_id, email, name, password, verified, created_at = row
+        return {
+            'id': str(user_id),
+            'name': name,
+            'email': email,
+            'password': password,
+            'verified': bool(verified),
+            'created_at': created_at
+        }
+
+    def _execute(self, sql, params=()):
+        with self.lock:
+            cursor = self.db.execute(sql, params)
+            self.db.commit()
+            return cursor
+
+    def add_user(self, email, name, password, created_at):
+        """Create an unverified user, or return None if the email is taken"""
+        try:
+            cursor = self._execute('INSERT INTO users (email, name, password, created_at) VALUES (?, ?, ?, ?)',
+                                   (email, name, password, created_at))
+        except sqlite3.IntegrityError:
+            return None
+        return self._user((cursor.lastrowid, email, name, password, 0, created_at))
+
+    def get_user(self, email):
+        with self.lock:
+            row = self.db.execute('SELECT id, email, name, password, verified, created_at FROM users WHERE email = ?',
+                                  (email,)).fetchone()
+        return self._user(row)
+
+    def set_user_verified(self, email):
+        with self.lock:
+            with self.db:
+                if self.db.execute('UPDATE users SET verified = 1 WHERE email = ? AND verified = 0', (email,)).rowcount:
+                    self.db.execute("UPDATE counters SET value = value + 1 WHERE name = 'verified_users'")
+
+    def count_verified_users(self):
+        with self.lock:
+            return self.db.execute("SELECT value FROM counters WHERE name = 'verified_users'").fetchone()[0]
+
+    def set_verification_code(self, email, code):
+        self._execute('INSERT OR REPLACE INTO verification_codes (email, code) VALUES (?, ?)', (email, code))
+
+    def get_verification_code(self, email):
+        with self.lock:
+            row = self.db.execute('SELECT code FROM verification_codes WHERE email = ?', (email,)).fetchone()
+        return row[0] if row else None
+
+    def delete_verification_code(self, email):
+        self._execute('DELETE FROM verification_codes WHERE email = ?', (email,))
+
+    def get_blockchain_hash(self, user_id):
+        with self.lock:
+            row = self.db.execute('SELECT hash FROM blockchain_hashes WHERE user_id = ?', (user_id,)).fetchone()
+        return row[0] if row else None
+
+    def set_blockchain_hash(self, user_id, value):
+        self._execute('INSERT OR REPLACE INTO blockchain_hashes (user_id, hash) VALUES (?, ?)', (user_id, value))
+
+    def add_rating(self, lat, lng, rating, timestamp):
+        self._queue('INSERT INTO ratings (lat, lng, rating, timestamp, writer) VALUES (?, ?, ?, ?, ?)',
+                    (lat, lng, rating, timestamp, self.writer))
+
+    def new_ratings(self):
+        """(lat, lng, rating, timestamp) rows written by other workers since the last call"""
+        # Step over this process's own rows too, so each row is read only once
+        with self.lock:
+            rows = self.db.execute('SELECT id, lat, lng, rating, timestamp, writer FROM ratings WHERE id > ? ORDER BY id',
+                                   (self.ratings_cursor,)).fetchall()
+            if rows:
+                self.ratings_cursor = rows[-1][0]
+        return [row[1:5] for row in rows if row[5] != self.writer]
+
+    def add_alert(self, alert):
+        ts, lat, lng = alert_fields(alert)
+        row = None
+        if 'hits' in alert:
+            # Deduplicated alerts get their hit counts written back later, by row id
+            row = self.alert_rows[id(alert)] = AlertRow(alert)
+            while len(self.alert_rows) > self.tracked_alerts:
+                self.alert_rows.popitem(last=False)
+        self._queue('INSERT INTO alerts (type, timestamp, alert, ts, cell, writer) VALUES (?, ?, ?, ?, ?, ?)',
+                    (alert['type'], alert['timestamp'], json.dumps(alert), ts, alert_cell(lat, lng), self.writer), row)
+        self.alerts.append(alert)
+
+    def update_alert(self, alert):
+        """Rewrite one of this process's alerts, e.g. after its hit count changed"""
+        row = self.alert_rows.get(id(alert))
+        if row is None or row.alert is not alert:
+            return
+        self._queue('UPDATE alerts SET alert = ? WHERE id = ?', (json.dumps(alert),), row)
+
+    def recent_alerts(self, limit):
+        """The newest alerts, oldest first, without waiting for queued writes"""
+        with self.lock:
+            rows = self.db.execute('SELECT id, writer, alert FROM alerts WHERE id > ? ORDER BY id',
+                                   (self.alerts_cursor,)).fetchall()
+            if rows:
+                self.alerts_cursor = rows[-1][0]
+        # This process's own alerts went into the ring when they were added
+        for _, writer, alert in rows:
+            if writer != self.writer:
+                self.alerts.append(json.loads(alert))
+        return self.alerts.recent(limit)
+
+    def query_alerts(self, query, before=None, limit=ALERT_PAGE_SIZE):
+        """Newest-first page of (alert_id, alert) matching `query`, older than `before`"""
+        self.flush()
+        clauses, params = [], []
+        if query.types:
+            clauses.append(f"type IN ({', '.join('?' * len(query.types))})")
+            params.extend(query.types)
+        if query.since is not None:
+            clauses.append('ts >= ?')
+            params.append(query.since)
+        if query.until is not None:
+            clauses.append('ts < ?')
+            params.append(query.until)
+        cells = area_cell_ranges(query.area) if query.area else None
+        if cells:
+            clauses.append(f"({' OR '.join(['cell BETWEEN ? AND ?'] * len(cells))})")
+            params.extend(bound for cell_range in cells for bound in cell_range)
+        elif query.area:
+            clauses.append('cell IS NOT NULL')
+        # Left to itself SQLite walks the whole table in id order to honour
+        # ORDER BY id; "+id" keeps it on the time or cell index instead
+        ranged = query.since is not None or query.until is not None or query.area
+        where = ' AND '.join(clauses + ['+id < ?' if ranged else 'id < ?'])
+        table = 'alerts INDEXED BY alerts_cell' if cells else 'alerts'
+
+        # The cells cover more than the radius, so keep reading until the page fills
+        page = []
+        while len(page) < limit:
+            with self.lock:
+                rows = self.db.execute(f'SELECT id, alert FROM {table} WHERE {where} ORDER BY id DESC LIMIT ?',
+                                       params + [before if before is not None else 2 ** 63 - 1, limit * 2]).fetchall()
+            for alert_id, raw in rows:
+                alert = json.loads(raw)
+                if query.in_area(*alert_position(alert)):
+                    page.append((alert_id, alert))
+                    if len(page) == limit:
+                        break
+            if len(rows) < limit * 2:
+                break
+            before = rows[-1][0]
+        return page
+
+    def prune_alerts(self):
+        """Drop alerts older than the retention window"""
+        with self.lock:
+            with self.db:
+                self.db.execute('DELETE FROM alerts WHERE ts < ?', (time.time() - self.retention,))
+
+    def _queue(self, sql, params, row=None):
+        """Queue a write; with an AlertRow an insert records the new row id, and anything else ends WHERE id = ?"""
+        with self.pending_lock:
+            self.pending.append((sql, params, row))
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self.wake.set()
+
+    def flush(self):
+        """Write every queued row in one transaction, in the order they were queued"""
+        # Take the batch under the database lock so batches land in queue order
+        with self.lock:
+            with self.pending_lock:
+                batch, self.pending = self.pending, []
+            if not batch:
+                return
+            with self.db:
+                # Runs of the same plain statement still go through one executemany
+                for (sql, row), writes in itertools.groupby(batch, key=lambda write: (write[0], write[2])):
+                    if row is None:
+                        self.db.executemany(sql, [params for _, params, _ in writes])
+                        continue
+                    for _, params, _ in writes:
+                        if row.id is None:
+                            row.id = self.db.execute(sql, params).lastrowid
+                        else:
+                            self.db.execute(sql, params + (row.id,))
+
+    def _flush_loop(self):
+        while True:
+            self.wake.wait(self.flush_seconds)
+            self.wake.clear()
+            try:
+                self.flush()
+                if time.monotonic() - self.pruned_at > 3600:
+                    self.pruned_at = time.monotonic()
+                    self.prune_alerts()
+            except Exception as e:
+                print(f"Storage flush error: {e}")
+
+    def stats(self):
+        with self.lock:
+            users = self.db.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+        return {'backend': 'sqlite', 'users': users, 'recent_alerts': len(self.alerts),
+                'pending_writes': len(self.pending)}
+
+def make_storage():
+    """Build the storage backend picked by STORAGE_BACKEND"""
+    if STORAGE_BACKEND == 'memory':
+        return MemoryStorage(ALERT_RECENT_SIZE)
+    return SQLiteStorage(STORAGE_PATH, STORAGE_BATCH_SIZE, STORAGE_FLUSH_SECONDS,
+                         ALERT_RECENT_SIZE, ALERT_RETENTION_DAYS, ALERT_DEDUP_MAX_KEYS)
+
+# Durable state: accounts, ratings and alerts
+storage = make_storage()
+alert_deduper = AlertDeduper(ALERT_DEDUP_SECONDS, ALERT_DEDUP_MAX_KEYS)
+ratings = RatingStore()
+rating_tiles = RatingTiles(RATING_TILE_LEVELS)
+
+def write_alert_hits(alerts):
+    for alert in alerts:
+        storage.update_alert(alert)
+
+def alert_hits_loop():
+    """Write back final hit counts once quiet dedup windows close"""
+    while True:
+        time.sleep(min(ALERT_DEDUP_SECONDS, 60))
+        try:
+            write_alert_hits(alert_deduper.close_expired())
+        except Exception as e:
+            print(f"Alert hit count error: {e}")
+
+threading.Thread(target=alert_hits_loop, name='alert-hits', daemon=True).start()
+atexit.register(lambda: write_alert_hits(alert_deduper.close_all()))  # Runs before storage's own final flush
+
+# Per-process state
+behavior_history = BehaviorStore(TRACKING_TTL_SECONDS, TRACKING_MAX_USERS, BEHAVIOR_HISTORY_SIZE)  # {user_id: PositionRing}
 active_sessions = {}
-verification_codes = {}
-blockchain_hashes = {}
+
+def make_tracking_redis():
+    """Redis client for live tracking shared between workers, or None to keep it per process"""
+    if not TRACKING_REDIS_URL:
+        return None
+    import redis
+    return redis.Redis.from_url(TRACKING_REDIS_URL, decode_responses=True)
 
 # Tourist hotspots storage
-tourist_locations = {}  # {user_id: {'lat': float, 'lng': float, 'timestamp': str, 'name': str}}
-hotspots = []  # List of active hotspots
+tracking_redis = make_tracking_redis()
+if tracking_redis is not None:
+    tourist_locations = RedisTrackingStore(tracking_redis, 'tracking:tourists:', TRACKING_TTL_SECONDS, TRACKING_MAX_USERS)
+else:
+    tourist_locations = ExpiringStore(TRACKING_TTL_SECONDS, TRACKING_MAX_USERS)  # {user_id: {'lat', 'lng', 'timestamp', 'seen', 'name'}}
+hotspots = {}  # {hotspot_id: hotspot} - ids stay stable for the hotspot's lifetime
+hotspot_membership = {}  # {user_id: hotspot_id}
+
+# Hotspot detection settings
+HOTSPOT_RADIUS_KM = 0.5  # Tourists within 500m of each other form a cluster
+HOTSPOT_MIN_TOURISTS = 3
+HOTSPOT_WINDOW = TRACKING_TTL_SECONDS  # Only recent locations count towards hotspots
+HOTSPOT_REFRESH_SECONDS = float(os.environ.get('HOTSPOT_REFRESH_SECONDS', 1.0))
+HOTSPOT_DIRTY_LIMIT = int(os.environ.get('HOTSPOT_DIRTY_LIMIT', 500))  # Refresh early after this many moves
 
 # Local language database
 LOCAL_LANGUAGES = {
@@ -132,6 +1231,101 @@ LOCAL_LANGUAGES = {
     'auckland': {'language': 'English/Maori', 'code': 'en/mi', 'script': 'Latin', 'greeting': 'Hello', 'thank_you': 'Thank you'}
 }
 
+# Countries and demonyms resolve to the language of a major city
+LOCATION_ALIASES = {
+    'japan': 'tokyo',
+    'japanese': 'tokyo',
+    'india': 'delhi',
+    'indian': 'delhi',
+    'france': 'paris',
+    'french': 'paris',
+    'china': 'beijing',
+    'chinese': 'beijing',
+    'russia': 'moscow',
+    'russian': 'moscow',
+    'turkey': 'istanbul',
+    'turkish': 'istanbul',
+    'egypt': 'cairo',
+    'egyptian': 'cairo',
+    'uae': 'dubai',
+    'united arab emirates': 'dubai',
+    'arab': 'dubai',
+    'australia': 'sydney',
+    'australian': 'sydney',
+    'uk': 'london',
+    'united kingdom': 'london',
+    'british': 'london',
+    'usa': 'new york',
+    'united states': 'new york',
+    'america': 'new york',
+    'american': 'new york',
+    'italy': 'rome',
+    'italian': 'rome',
+    'spain': 'barcelona',
+    'spanish': 'barcelona',
+    'netherlands': 'amsterdam',
+    'dutch': 'amsterdam',
+    'germany': 'berlin',
+    'german': 'berlin',
+    'czech republic': 'prague',
+    'czech': 'prague',
+    'austria': 'vienna',
+    'austrian': 'vienna',
+    'thailand': 'bangkok',
+    'thai': 'bangkok',
+    'south korea': 'seoul',
+    'korean': 'seoul',
+    'malaysia': 'kuala lumpur',
+    'malay': 'kuala lumpur',
+    'mexico': 'mexico city',
+    'mexican': 'mexico city',
+    'canada': 'toronto',
+    'canadian': 'toronto',
+    'brazil': 'sao paulo',
+    'brazilian': 'sao paulo',
+    'argentina': 'buenos aires',
+    'argentinian': 'buenos aires',
+    'israel': 'jerusalem',
+    'hebrew': 'jerusalem',
+    'saudi arabia': 'riyadh',
+    'saudi': 'riyadh',
+    'south africa': 'cape town',
+    'african': 'cape town',
+    'kenya': 'nairobi',
+    'kenyan': 'nairobi',
+    'new zealand': 'auckland',
+    'zealand': 'auckland'
+}
+
+# Language names resolve to a city where the language is spoken
+LANGUAGE_KEYWORDS = {
+    'hindi': 'delhi',
+    'marathi': 'mumbai',
+    'bengali': 'kolkata',
+    'tamil': 'chennai',
+    'telugu': 'hyderabad',
+    'kannada': 'bangalore',
+    'gujarati': 'ahmedabad',
+    'rajasthani': 'jaipur',
+    'french': 'paris',
+    'english': 'london',
+    'japanese': 'tokyo',
+    'mandarin': 'beijing',
+    'chinese': 'beijing',
+    'russian': 'moscow',
+    'arabic': 'dubai',
+    'turkish': 'istanbul',
+    'portuguese': 'rio'
+}
+
+DEFAULT_LANGUAGE = {
+    'language': 'English',
+    'code': 'en',
+    'script': 'Latin',
+    'greeting': 'Hello',
+    'thank_you': 'Thank you'
+}
+
 # Common tourist phrases in different languages
 TOURIST_PHRASES = {
     'hi': {  # Hindi
@@ -378,6 +1572,139 @@ WEATHER_CODES = {
     99: {"description": "Thunderstorm with heavy hail", "icon": "⛈️"}
 }
 
+class UpstreamClient:
+    """Shared HTTP client for every external API call.
+
+    One requests.Session keeps pooled keep-alive connections per host,
+    retries idempotent requests with jittered exponential backoff, and a
+    semaphore per host caps how many requests are in flight at once.
+    Callers that pace their own requests pass retry=False and get a single
+    attempt from a second session without retries.
+    """
+
+    def __init__(self, pool_size, host_concurrency, retries, timeout):
+        self.timeout = timeout
+        self.host_concurrency = host_concurrency
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.3,
+            backoff_jitter=0.2,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True,
+            raise_on_status=False  # Hand back the last response, as before retries existed
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.single_session = requests.Session()
+        self.single_session.headers['User-Agent'] = USER_AGENT
+        single = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.single_session.mount('https://', single)
+        self.single_session.mount('http://', single)
+        self.host_slots = {}
+        self.lock = threading.Lock()
+
+    def _slots(self, host):
+        with self.lock:
+            slots = self.host_slots.get(host)
+            if slots is None:
+                slots = self.host_slots[host] = threading.BoundedSemaphore(self.host_concurrency)
+            return slots
+
+    def get(self, url, params=None, headers=None, timeout=None, retry=True):
+        session = self.session if retry else self.single_session
+        with self._slots(urlsplit(url).netloc):
+            return session.get(url, params=params, headers=headers, timeout=timeout or self.timeout)
+
+upstream = UpstreamClient(UPSTREAM_POOL_SIZE, UPSTREAM_HOST_CONCURRENCY, UPSTREAM_RETRIES, UPSTREAM_TIMEOUT)
+
+class TTLCache:
+    """In-process cache with per-entry expiry and LRU eviction"""
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # {key: (expires_at, value)}, least recently used first
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (time.time() + (ttl or self.ttl), value)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        return {
+            'backend': 'memory',
+            'size': len(self.entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+class RedisCache:
+    """TTL cache kept in a Redis-compatible server so workers share entries.
+
+    Redis expires keys itself; size is bounded by the server's maxmemory
+    policy (use allkeys-lru for LRU eviction).
+    """
+
+    def __init__(self, client, prefix, ttl):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, json.dumps(value), ex=ttl or self.ttl)
+
+    def stats(self):
+        return {'backend': 'redis', 'hits': self.hits, 'misses': self.misses}
+
+def make_cache(name, ttl, max_entries):
+    """Build a cache on the configured backend"""
+    if CACHE_REDIS_URL:
+        import redis
+        return RedisCache(redis.Redis.from_url(CACHE_REDIS_URL), f"{name}:", ttl)
+    return TTLCache(ttl, max_entries)
+
+weather_cache = make_cache('weather', WEATHER_CACHE_TTL_SECONDS, WEATHER_CACHE_SIZE)
+
+def weather_cache_key(lat, lng):
+    """Snap coordinates to the cache grid so nearby lookups share an entry"""
+    grid = WEATHER_CACHE_GRID_DEG
+    return f"{round(lat / grid) * grid:.4f},{round(lng / grid) * grid:.4f}"
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -391,83 +1718,212 @@ def get_weather():
         return jsonify({'error': 'Latitude and longitude required'}), 400
 
     try:
-        params = {
-            'latitude': lat,
-            'longitude': lng,
-            'current': 'temperature_2m,relative_humidity_2m,apparent_temperature,precipitation,weather_code,wind_speed_10m',
-            'timezone': 'auto'
-        }
-
-        response = requests.get(WEATHER_API_URL, params=params)
-        data = response.json()
+        cache_key = weather_cache_key(lat, lng)
+        data = weather_cache.get(cache_key)
+        if data is None:
+            response = upstream.get(WEATHER_API_URL, params=weather_params(lat, lng))
+            data = response.json()
+            if 'current' in data:
+                weather_cache.set(cache_key, data)
 
         if 'current' in data:
-            weather_info = WEATHER_CODES.get(data['current']['weather_code'],
-                                            {'description': 'Unknown', 'icon': '❓'})
-
-            weather_data = {
-                'temperature': round(data['current']['temperature_2m']),
-                'feels_like': round(data['current']['apparent_temperature']),
-                'humidity': data['current']['relative_humidity_2m'],
-                'wind_speed': data['current']['wind_speed_10m'],
-                'precipitation': data['current']['precipitation'],
-                'description': weather_info['description'],
-                'icon': weather_info['icon'],
-                'coordinates': f"{data['latitude']:.4f}, {data['longitude']:.4f}"
-            }
-
-            # Check for weather alerts
-            alerts = check_weather_alerts(data['current'])
-            if alerts:
-                weather_data['alerts'] = alerts
-                log_alert('weather_alert', f"Weather alerts at {weather_data['coordinates']}", {
-                    'alerts': alerts,
-                    'weather': weather_data
-                })
-
-            return jsonify(weather_data)
+            return jsonify(build_weather_data(data))
         else:
             return jsonify({'error': 'Weather data not available'}), 404
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def weather_params(lat, lng):
+    """Open-Meteo query for current conditions at a point"""
+    return {
+        'latitude': lat,
+        'longitude': lng,
+        'current': 'temperature_2m,relative_humidity_2m,apparent_temperature,precipitation,weather_code,wind_speed_10m',
+        'timezone': 'auto'
+    }
+
+def build_weather_data(data):
+    """Shape an Open-Meteo response for the frontend and log any weather alerts"""
+    weather_info = WEATHER_CODES.get(data['current']['weather_code'],
+                                    {'description': 'Unknown', 'icon': '❓'})
+
+    weather_data = {
+        'temperature': round(data['current']['temperature_2m']),
+        'feels_like': round(data['current']['apparent_temperature']),
+        'humidity': data['current']['relative_humidity_2m'],
+        'wind_speed': data['current']['wind_speed_10m'],
+        'precipitation': data['current']['precipitation'],
+        'description': weather_info['description'],
+        'icon': weather_info['icon'],
+        'coordinates': f"{data['latitude']:.4f}, {data['longitude']:.4f}"
+    }
+
+    # Check for weather alerts
+    alerts = check_weather_alerts(data['current'])
+    if alerts:
+        weather_data['alerts'] = alerts
+        log_alert('weather_alert', f"Weather alerts at {weather_data['coordinates']}", {
+            'alerts': alerts,
+            'weather': weather_data
+        }, dedup_key=tuple(alerts))
+
+    return weather_data
+
+class PartialResult:
+    """A loader result to serve this time but not cache, e.g. one missing failed lookups"""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+class PersistentCache:
+    """SQLite-backed cache for slow-changing upstream content.
+
+    Entries younger than `ttl` are served as-is. Older entries are still
+    served for up to `stale_ttl` while a background thread refreshes them
+    (stale-while-revalidate); past that the lookup blocks on the loader.
+    """
+
+    def __init__(self, path, ttl, stale_ttl):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, fetched_at REAL NOT NULL)')
+        self.db.commit()
+        self.lock = threading.Lock()
+        self.refreshing = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return (value, age_seconds), or (None, None) when absent"""
+        with self.lock:
+            row = self.db.execute('SELECT value, fetched_at FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None, None
+        return json.loads(row[0]), time.time() - row[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.db.execute('INSERT OR REPLACE INTO cache (key, value, fetched_at) VALUES (?, ?, ?)',
+                            (key, json.dumps(value), time.time()))
+            self.db.commit()
+
+    def lookup(self, key, loader):
+        """Serve `key` from the cache, calling loader() to fill or refresh it"""
+        value = self.cached(key, loader)
+        if value is None:
+            value = self.refresh(key, loader)
+        return value
+
+    def cached(self, key, loader):
+        """Return a usable cached value, refreshing stale ones in the background, or None on a miss"""
+        value, age = self.get(key)
+        if value is not None and age < self.ttl:
+            self.hits += 1
+            return value
+        if value is not None and age < self.stale_ttl:
+            self.stale_hits += 1
+            self._refresh_in_background(key, loader)
+            return value
+
+        self.misses += 1
+        return None
+
+    def refresh(self, key, loader):
+        return self.store(key, loader())
+
+    def store(self, key, value):
+        """Save a freshly loaded value; empty and partial results are skipped so failures get retried"""
+        if isinstance(value, PartialResult):
+            return value.value
+        if value:
+            self.set(key, value)
+        return value
+
+    def _refresh_in_background(self, key, loader):
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+
+        def run():
+            try:
+                self.refresh(key, loader)
+            finally:
+                with self.lock:
+                    self.refreshing.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def stats(self):
+        with self.lock:
+            size = self.db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        return {
+            'backend': 'sqlite',
+            'size': size,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses
+        }
+
+wiki_cache = PersistentCache(WIKI_CACHE_PATH, WIKI_CACHE_TTL_SECONDS, WIKI_CACHE_STALE_SECONDS)
+
+# Shared pool for fanning out independent upstream requests
+upstream_pool = ThreadPoolExecutor(max_workers=UPSTREAM_WORKERS, thread_name_prefix='upstream')
+
+def normalize_location(location_name):
+    """Canonical cache key for a place name"""
+    return ' '.join(location_name.lower().split())
+
+def wikipedia_info_key(location_name):
+    return 'info:' + normalize_location(location_name.split(',')[0])
+
+def wikipedia_attractions_key(location):
+    return 'attractions:' + normalize_location(location)
+
 def get_wikipedia_info(location_name):
+    """Get Wikipedia page information, cached on disk by location name"""
+    return wiki_cache.lookup(wikipedia_info_key(location_name), lambda: fetch_wikipedia_info(location_name))
+
+def get_wikipedia_attractions(location):
+    """Get tourist attractions for a location, cached on disk by location name"""
+    return wiki_cache.lookup(wikipedia_attractions_key(location), lambda: fetch_wikipedia_attractions(location)) or []
+
+@app.cli.command('warm-wiki-cache')
+@click.argument('locations', nargs=-1)
+def warm_wiki_cache(locations):
+    """Prefetch Wikipedia data for LOCATIONS (default: every known city)"""
+    for location in locations or LOCAL_LANGUAGES.keys():
+        info = wiki_cache.refresh(wikipedia_info_key(location), lambda: fetch_wikipedia_info(location))
+        attractions = wiki_cache.refresh(wikipedia_attractions_key(location),
+                                         lambda: fetch_wikipedia_attractions(location))
+        click.echo(f"{location}: {'summary' if info else 'no summary'}, {len(attractions or [])} attractions")
+
+def fetch_wikipedia_info(location_name):
     """Get Wikipedia page information using Wikimedia REST API"""
     try:
         # Clean location name for Wikipedia
         clean_name = location_name.split(',')[0].strip()
 
         # Use Wikimedia REST API to get page summary
-        summary_url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{clean_name.replace(' ', '_')}"
-
-        response = requests.get(summary_url, timeout=5)
+        response = upstream.get(wikipedia_summary_url(clean_name))
         if response.status_code == 200:
-            data = response.json()
-            return {
-                'title': data.get('title', clean_name),
-                'url': f"https://en.wikipedia.org/wiki/{clean_name.replace(' ', '_')}",
-                'description': data.get('extract', f'Learn more about {clean_name} on Wikipedia').split('.')[0] + '.',
-                'thumbnail': data.get('thumbnail', {}).get('source') if data.get('thumbnail') else None
-            }
+            return build_wikipedia_info(response.json(), clean_name)
         else:
             # Fallback: try with different capitalization or search
-            search_url = f"https://en.wikipedia.org/w/api.php?action=query&list=search&srsearch={clean_name}&format=json&srlimit=1"
-            search_response = requests.get(search_url, timeout=5)
+            search_response = upstream.get(wikipedia_title_search_url(clean_name))
             if search_response.status_code == 200:
-                search_data = search_response.json()
-                if search_data.get('query', {}).get('search'):
-                    found_title = search_data['query']['search'][0]['title']
-                    summary_url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{found_title.replace(' ', '_')}"
-                    summary_response = requests.get(summary_url, timeout=5)
+                found_title = first_search_title(search_response.json())
+                if found_title:
+                    summary_response = upstream.get(wikipedia_summary_url(found_title))
                     if summary_response.status_code == 200:
-                        data = summary_response.json()
-                        return {
-                            'title': data.get('title', found_title),
-                            'url': f"https://en.wikipedia.org/wiki/{found_title.replace(' ', '_')}",
-                            'description': data.get('extract', f'Learn more about {found_title} on Wikipedia').split('.')[0] + '.',
-                            'thumbnail': data.get('thumbnail', {}).get('source') if data.get('thumbnail') else None
-                        }
+                        return build_wikipedia_info(summary_response.json(), found_title)
 
         return None
 
@@ -475,51 +1931,100 @@ def get_wikipedia_info(location_name):
         print(f"Wikipedia API error: {e}")
         return None
 
-def get_wikipedia_attractions(location):
+def wikipedia_summary_url(title):
+    return f"https://en.wikipedia.org/api/rest_v1/page/summary/{title.replace(' ', '_')}"
+
+def wikipedia_title_search_url(name):
+    return f"https://en.wikipedia.org/w/api.php?action=query&list=search&srsearch={name}&format=json&srlimit=1"
+
+def wikipedia_opensearch_url(query):
+    return f"https://en.wikipedia.org/w/api.php?action=opensearch&search={query}&limit=5&namespace=0&format=json"
+
+def first_search_title(search_data):
+    """Title of the top hit in a Wikipedia search response, if any"""
+    results = search_data.get('query', {}).get('search')
+    return results[0]['title'] if results else None
+
+def build_wikipedia_info(data, title):
+    """Shape a Wikipedia page summary for the frontend"""
+    return {
+        'title': data.get('title', title),
+        'url': f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}",
+        'description': data.get('extract', f'Learn more about {title} on Wikipedia').split('.')[0] + '.',
+        'thumbnail': data.get('thumbnail', {}).get('source') if data.get('thumbnail') else None
+    }
+
+def attraction_search_queries(location):
+    """Multiple search queries for better results, in priority order"""
+    return [
+        f"tourist attractions in {location}",
+        f"places to visit in {location}",
+        f"landmarks in {location}",
+        f"sights in {location}",
+        f"points of interest in {location}"
+    ]
+
+def merge_attractions(location, title_lists):
+    """Merge search results in priority order, topping up with popular spots"""
+    all_attractions = []
+    seen_titles = set()
+
+    for titles in title_lists:
+        for title in titles:
+            # Filter out irrelevant results
+            if (title not in seen_titles and
+                not any(word in title.lower() for word in ['list of', 'category:', 'template:', 'wikipedia:', 'file:', 'portal:']) and
+                len(title) > 3):
+                all_attractions.append({
+                    'name': title,
+                    'url': f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}",
+                    'type': 'wikipedia'
+                })
+                seen_titles.add(title)
+
+    # Add some popular attractions for major cities if we have few results
+    if len(all_attractions) < 5:
+        popular_attractions = get_popular_attractions(location)
+        for attraction in popular_attractions:
+            if attraction['name'] not in seen_titles:
+                all_attractions.append(attraction)
+                seen_titles.add(attraction['name'])
+
+    return all_attractions[:10]  # Limit to 10 attractions
+
+def fetch_wikipedia_attractions(location):
     """Get tourist attractions for a location using Wikipedia search"""
     try:
-        # Multiple search queries for better results
-        search_queries = [
-            f"tourist attractions in {location}",
-            f"places to visit in {location}",
-            f"landmarks in {location}",
-            f"sights in {location}",
-            f"points of interest in {location}"
-        ]
-
-        all_attractions = []
-        seen_titles = set()
-
-        for query in search_queries:
-            search_url = f"https://en.wikipedia.org/w/api.php?action=opensearch&search={query}&limit=5&namespace=0&format=json"
-            response = requests.get(search_url, timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                for title in data[1]:  # data[1] contains the list of page titles
-                    # Filter out irrelevant results
-                    if (title not in seen_titles and
-                        not any(word in title.lower() for word in ['list of', 'category:', 'template:', 'wikipedia:', 'file:', 'portal:']) and
-                        len(title) > 3):
-                        all_attractions.append({
-                            'name': title,
-                            'url': f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}",
-                            'type': 'wikipedia'
-                        })
-                        seen_titles.add(title)
-
-        # Add some popular attractions for major cities if we have few results
-        if len(all_attractions) < 5:
-            popular_attractions = get_popular_attractions(location)
-            for attraction in popular_attractions:
-                if attraction['name'] not in seen_titles:
-                    all_attractions.append(attraction)
-                    seen_titles.add(attraction['name'])
-
-        return all_attractions[:10]  # Limit to 10 attractions
+        # Run the searches concurrently under one deadline
+        futures = [upstream_pool.submit(search_wikipedia_titles, query)
+                   for query in attraction_search_queries(location)]
+        done, pending = wait(futures, timeout=WIKI_ATTRACTIONS_DEADLINE)
+        for future in pending:
+            future.cancel()
+
+        # Slow or failed searches contribute nothing
+        title_lists = [future.result() if future in done and future.exception() is None else None
+                       for future in futures]
+        return attractions_result(location, title_lists)
     except Exception as e:
         print(f"Wikipedia attractions error: {e}")
         return []
 
+def attractions_result(location, title_lists):
+    """Merged attractions, marked partial when any search failed (None) so it isn't cached"""
+    attractions = merge_attractions(location, [titles or [] for titles in title_lists])
+    if any(titles is None for titles in title_lists):
+        # The popular-spot fallback would otherwise be cached as if it were the real answer
+        return PartialResult(attractions)
+    return attractions
+
+def search_wikipedia_titles(query):
+    """Page titles matching a Wikipedia opensearch query, or None if the search failed"""
+    response = upstream.get(wikipedia_opensearch_url(query))
+    if response.status_code == 200:
+        return response.json()[1]  # data[1] contains the list of page titles
+    return None
+
 def get_popular_attractions(location):
     """Get popular attractions for major locations"""
     location_lower = location.lower()
@@ -854,79 +2359,576 @@ def get_popular_attractions(location):
 
     return popular_spots.get(location_lower, [])
 
-def detect_hotspots():
-    """Detect tourist hotspots based on clustered locations"""
-    global hotspots
-    hotspots = []
-
-    if len(tourist_locations) < 3:  # Need at least 3 tourists for a hotspot
-        return hotspots
-
-    # Convert locations to list for clustering
-    locations = []
-    for user_id, data in tourist_locations.items():
-        # Only consider recent locations (within last 30 minutes)
-        if datetime.now() - datetime.fromisoformat(data['timestamp']) < timedelta(minutes=30):
-            locations.append({
-                'user_id': user_id,
-                'lat': data['lat'],
-                'lng': data['lng'],
-                'name': data['name']
-            })
+class SpatialGrid:
+    """Fixed-cell spatial index so neighbour lookups only touch nearby cells"""
+
+    KM_PER_DEGREE = 111.32
+
+    def __init__(self, cell_km):
+        self.cell_km = cell_km
+        self.cell_deg = cell_km / self.KM_PER_DEGREE
+        self.columns = int(math.ceil(360 / self.cell_deg))
+        self.cells = {}  # {(row, col): {key, ...}}
+        self.positions = {}  # {key: (row, col)}
+
+    def _cell(self, lat, lng):
+        row = int(math.floor((lat + 90) / self.cell_deg))
+        col = int(math.floor((lng + 180) / self.cell_deg)) % self.columns
+        return row, col
+
+    def update(self, key, lat, lng):
+        """Insert a key or move it to the cell containing (lat, lng)"""
+        cell = self._cell(lat, lng)
+        old_cell = self.positions.get(key)
+        if old_cell == cell:
+            return
+        if old_cell is not None:
+            self._discard(key, old_cell)
+        self.cells.setdefault(cell, set()).add(key)
+        self.positions[key] = cell
+
+    def remove(self, key):
+        cell = self.positions.pop(key, None)
+        if cell is not None:
+            self._discard(key, cell)
+
+    def _discard(self, key, cell):
+        members = self.cells.get(cell)
+        if members is not None:
+            members.discard(key)
+            if not members:
+                del self.cells[cell]
+
+    def nearby(self, lat, lng, radius_km):
+        """Yield keys in every cell that may hold a point within radius_km"""
+        row, col = self._cell(lat, lng)
+        row_span = int(math.ceil(radius_km / self.cell_km))
+        # Cells get narrower towards the poles, so widen the column span there
+        edge_lat = min(abs(lat) + row_span * self.cell_deg, 89.0)
+        col_span = int(math.ceil(radius_km / (self.cell_km * math.cos(math.radians(edge_lat)))))
+        col_span = min(col_span, self.columns // 2)
+
+        for r in range(row - row_span, row + row_span + 1):
+            for c in range(col - col_span, col + col_span + 1):
+                members = self.cells.get((r, c % self.columns))
+                if members:
+                    yield from members
+
+    def __len__(self):
+        return len(self.positions)
+
+class RedisGeoIndex:
+    """SpatialGrid counterpart backed by a Redis geo set (GEOADD / GEOSEARCH)"""
+
+    MAX_LAT = 85.05112878  # Redis geo sets only cover Web Mercator latitudes
+
+    def __init__(self, client, key):
+        self.client = client
+        self.key = key
+
+    def _clamp(self, lat):
+        return max(-self.MAX_LAT, min(self.MAX_LAT, lat))
+
+    def update(self, key, lat, lng):
+        self.client.geoadd(self.key, (lng, self._clamp(lat), key))
+
+    def remove(self, key):
+        self.client.zrem(self.key, key)
+
+    def nearby(self, lat, lng, radius_km):
+        """Keys within radius_km; callers still check exact distances"""
+        return self.client.geosearch(self.key, longitude=lng, latitude=self._clamp(lat),
+                                     radius=radius_km, unit='km')
+
+    def __len__(self):
+        return self.client.zcard(self.key)
+
+class HotspotSync:
+    """Shares hotspot detection between worker processes through Redis.
+
+    Workers queue moved tourists and hotspot joins in Redis. Whichever
+    worker holds the leader lease runs the hotspot passes on its own copy
+    of the hotspots, then publishes the result; every other worker reloads
+    its copy when the publish notification arrives.
+    """
+
+    def __init__(self, client, prefix, lease_seconds):
+        self.client = client
+        self.prefix = prefix
+        self.lease_ms = int(lease_seconds * 1000)
+        self.token = secrets.token_hex(8)
+        self.leading = False
+        self.published = None  # Last snapshot sent, to skip unchanged publishes
+
+    def key(self, name):
+        return f"{self.prefix}{name}"
+
+    def mark_dirty(self, user_id):
+        self.client.sadd(self.key('dirty'), user_id)
+
+    def queue_join(self, user_id, name, hotspot_id):
+        self.client.rpush(self.key('joins'), json.dumps([user_id, name, hotspot_id]))
+
+    def take_dirty(self):
+        pipe = self.client.pipeline()
+        pipe.smembers(self.key('dirty'))
+        pipe.delete(self.key('dirty'))
+        return pipe.execute()[0]
+
+    def take_joins(self):
+        pipe = self.client.pipeline()
+        pipe.lrange(self.key('joins'), 0, -1)
+        pipe.delete(self.key('joins'))
+        return [json.loads(join) for join in pipe.execute()[0]]
+
+    def lead(self):
+        """Take or renew the leader lease; a worker that just took over loads the shared hotspots"""
+        from redis.exceptions import WatchError
+
+        leader_key = self.key('leader')
+        if self.client.set(leader_key, self.token, nx=True, px=self.lease_ms):
+            acquired = True
+        else:
+            acquired = False
+            with self.client.pipeline() as pipe:
+                try:
+                    pipe.watch(leader_key)
+                    if pipe.get(leader_key) == self.token:
+                        pipe.multi()
+                        pipe.pexpire(leader_key, self.lease_ms)
+                        pipe.execute()
+                        acquired = True
+                except WatchError:
+                    pass
+
+        if acquired and not self.leading:
+            self.load()
+            self.published = None
+        self.leading = acquired
+        return acquired
+
+    def publish(self):
+        """Write the leader's hotspots to Redis and tell the other workers"""
+        with hotspot_lock:
+            snapshot = {hotspot_id: json.dumps(hotspot) for hotspot_id, hotspot in hotspots.items()}
+        if snapshot == self.published:
+            return
+        pipe = self.client.pipeline()
+        pipe.delete(self.key('hotspots'))
+        if snapshot:
+            pipe.hset(self.key('hotspots'), mapping=snapshot)
+        pipe.publish(self.key('hotspots'), self.token)
+        pipe.execute()
+        self.published = snapshot
+
+    def load(self):
+        """Replace this worker's hotspots with the published ones"""
+        shared = [json.loads(hotspot) for hotspot in self.client.hvals(self.key('hotspots'))]
+        with hotspot_lock:
+            for hotspot_id in list(hotspots):
+                hotspot_grid.remove(hotspot_id)
+            hotspots.clear()
+            hotspot_membership.clear()
+            for hotspot in shared:
+                hotspots[hotspot['id']] = hotspot
+                hotspot_grid.update(hotspot['id'], hotspot['lat'], hotspot['lng'])
+                for tourist in hotspot['tourists']:
+                    hotspot_membership[tourist['user_id']] = hotspot['id']
+
+    def listen(self):
+        """Reload hotspots whenever another worker publishes them"""
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.key('hotspots'))
+                self.load()
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message['data'] != self.token and not self.leading:
+                        self.load()
+            except Exception as e:
+                print(f"Hotspot sync error: {e}")
+                time.sleep(1)
+
+    def start(self):
+        threading.Thread(target=self.listen, name='hotspot-sync', daemon=True).start()
+
+# Spatial indexes over tourist locations and hotspot centers
+hotspot_grid = SpatialGrid(HOTSPOT_RADIUS_KM)
+if tracking_redis is not None:
+    tourist_grid = RedisGeoIndex(tracking_redis, 'tracking:geo')
+    hotspot_ids = iter(lambda: tracking_redis.incr('tracking:hotspot_ids'), None)
+    hotspot_sync = HotspotSync(tracking_redis, 'tracking:', max(5.0, 3 * HOTSPOT_REFRESH_SECONDS))
+else:
+    tourist_grid = SpatialGrid(HOTSPOT_RADIUS_KM)
+    hotspot_ids = itertools.count(1)
+    hotspot_sync = None
+hotspot_lock = threading.Lock()  # Guards tourist_locations, hotspots and both grids
+
+def is_recent(location, now=None):
+    """Check whether a tracked location falls inside the hotspot window"""
+    return (now or time.time()) - location['seen'] < HOTSPOT_WINDOW
+
+def _recenter_hotspot(hotspot):
+    """Move a hotspot's center to the mean position of its tracked tourists"""
+    members = [location for location in (tourist_locations.get(t['user_id']) for t in hotspot['tourists'])
+               if location is not None]
+    if members:
+        hotspot['lat'] = sum(loc['lat'] for loc in members) / len(members)
+        hotspot['lng'] = sum(loc['lng'] for loc in members) / len(members)
+        hotspot_grid.update(hotspot['id'], hotspot['lat'], hotspot['lng'])
+    hotspot['tourist_count'] = len(hotspot['tourists'])
+
+def _dissolve_hotspot(hotspot):
+    """Remove a hotspot and return the users that were still in it"""
+    del hotspots[hotspot['id']]
+    hotspot_grid.remove(hotspot['id'])
+    freed = [t['user_id'] for t in hotspot['tourists']]
+    for user_id in freed:
+        hotspot_membership.pop(user_id, None)
+    return freed
+
+def _leave_hotspot(user_id):
+    """Take a tourist out of their hotspot, dissolving it if it gets too small"""
+    hotspot_id = hotspot_membership.pop(user_id, None)
+    if hotspot_id is None:
+        return []
 
-    if len(locations) < 3:
-        return hotspots
+    hotspot = hotspots[hotspot_id]
+    hotspot['tourists'] = [t for t in hotspot['tourists'] if t['user_id'] != user_id]
+    if len(hotspot['tourists']) < HOTSPOT_MIN_TOURISTS:
+        return _dissolve_hotspot(hotspot)
 
-    # Simple clustering algorithm - group tourists within 500m radius
-    clusters = []
-    processed = set()
+    _recenter_hotspot(hotspot)
+    return []
 
-    for i, loc1 in enumerate(locations):
-        if loc1['user_id'] in processed:
+def _join_or_form_hotspot(user_id):
+    """Put a free tourist into the nearest hotspot, or form a new one around them"""
+    location = tourist_locations.get(user_id)
+    if location is None or user_id in hotspot_membership:
+        return None
+    lat, lng = location['lat'], location['lng']
+
+    # Join the closest existing hotspot in range
+    nearest = None
+    candidates = [hotspots[hotspot_id] for hotspot_id in hotspot_grid.nearby(lat, lng, HOTSPOT_RADIUS_KM)]
+    if candidates:
+        distances = haversine_km(lat, lng,
+                                 [h['lat'] for h in candidates],
+                                 [h['lng'] for h in candidates])
+        closest = int(np.argmin(distances))
+        if distances[closest] <= HOTSPOT_RADIUS_KM:
+            nearest = candidates[closest]
+
+    if nearest is not None:
+        nearest['tourists'].append({'name': location['name'], 'user_id': user_id})
+        hotspot_membership[user_id] = nearest['id']
+        _recenter_hotspot(nearest)
+        return nearest
+
+    # Otherwise gather nearby tourists that are not in a hotspot yet
+    now = time.time()
+    free = []
+    for other in tourist_grid.nearby(lat, lng, HOTSPOT_RADIUS_KM):
+        if other == user_id or other in hotspot_membership:
             continue
+        other_location = tourist_locations.get(other)
+        if other_location is None:
+            # Expired or evicted from the shared store; drop its stale geo entry
+            tourist_grid.remove(other)
+        elif is_recent(other_location, now):
+            free.append((other, other_location))
+    cluster = [(user_id, location)]
+    if free:
+        distances = haversine_km(lat, lng,
+                                 [other_location['lat'] for _, other_location in free],
+                                 [other_location['lng'] for _, other_location in free])
+        cluster.extend(entry for entry, distance in zip(free, distances) if distance <= HOTSPOT_RADIUS_KM)
+
+    if len(cluster) < HOTSPOT_MIN_TOURISTS:
+        return None
 
-        cluster = [loc1]
-        processed.add(loc1['user_id'])
+    hotspot = {
+        'id': f"hotspot_{next(hotspot_ids)}",
+        'lat': lat,
+        'lng': lng,
+        'tourist_count': len(cluster),
+        'tourists': [{'name': member['name'], 'user_id': uid} for uid, member in cluster],
+        'created_at': datetime.now().isoformat(),
+        'radius': int(HOTSPOT_RADIUS_KM * 1000)  # meters
+    }
+    hotspots[hotspot['id']] = hotspot
+    for uid, _ in cluster:
+        hotspot_membership[uid] = hotspot['id']
+    _recenter_hotspot(hotspot)
+    return hotspot
+
+def update_hotspots_for(user_id):
+    """Incrementally update only the hotspots a moved tourist leaves or joins"""
+    location = tourist_locations.get(user_id)
+    hotspot_id = hotspot_membership.get(user_id)
+
+    if hotspot_id is not None and location is not None:
+        hotspot = hotspots[hotspot_id]
+        if calculate_distance(location['lat'], location['lng'], hotspot['lat'], hotspot['lng']) <= HOTSPOT_RADIUS_KM:
+            # Still inside the same hotspot, only its center shifts
+            _recenter_hotspot(hotspot)
+            return
+
+    freed = _leave_hotspot(user_id)
+    _join_or_form_hotspot(user_id)
+
+    # Tourists left behind by a dissolved hotspot may still cluster elsewhere
+    for other in freed:
+        _join_or_form_hotspot(other)
+
+def _add_to_hotspot(user_id, name, hotspot_id):
+    """Move a tourist into a given hotspot; False if it is gone or they are already in it"""
+    hotspot = hotspots.get(hotspot_id)
+    if hotspot is None or hotspot_membership.get(user_id) == hotspot_id:
+        return False
+
+    # A tourist belongs to one hotspot at a time
+    for other in _leave_hotspot(user_id):
+        _join_or_form_hotspot(other)
+    hotspot['tourists'].append({'name': name, 'user_id': user_id})
+    hotspot_membership[user_id] = hotspot_id
+    _recenter_hotspot(hotspot)
+    return True
+
+def forget_tourists(dropped):
+    """Remove evicted tourists from the grid and from their hotspots"""
+    for user_id, _ in dropped:
+        tourist_grid.remove(user_id)
+        for other in _leave_hotspot(user_id):
+            _join_or_form_hotspot(other)
+
+def expire_tracking_data():
+    """Evict tourists and behavior histories that fell out of the tracking window"""
+    with hotspot_lock:
+        forget_tourists(tourist_locations.expire())
+    behavior_history.expire()
+
+def update_tourist_location(user_id, lat, lng, name="Anonymous Tourist"):
+    """Record a tourist's location; hotspots catch up in the background"""
+    update_tourist_locations([(user_id, lat, lng, name)])
+
+def update_tourist_locations(updates):
+    """Record (user_id, lat, lng, name) locations under one lock and queue one hotspot update each"""
+    timestamp = datetime.now().isoformat()
+    seen = time.time()
+    dropped = []
+    with hotspot_lock:
+        for user_id, lat, lng, name in updates:
+            evicted = tourist_locations.set(user_id, {
+                'lat': lat,
+                'lng': lng,
+                'timestamp': timestamp,
+                'seen': seen,
+                'name': name
+            })
+            tourist_grid.update(user_id, lat, lng)
+            forget_tourists(evicted)
+            dropped.extend(evicted)
+    for user_id, _, _, _ in updates:
+        hotspot_scheduler.mark_dirty(user_id)
+    for evicted, _ in dropped:
+        # With shared tracking the worker running hotspot passes drops them too
+        hotspot_scheduler.mark_dirty(evicted)
+
+class StreamClient:
+    """One streaming client's bounded queue of pending events.
+
+    A client that falls `max_pending` events behind loses the oldest ones;
+    the loss is counted and reported so it can resync over REST instead.
+    """
+
+    def __init__(self, max_pending, area=None, notify=None):
+        self.pending = deque(maxlen=max_pending)
+        self.area = area  # (lat, lng, radius_km), or None for every event
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.notify = notify or self.ready.set
+
+    def wants(self, event):
+        if self.area is None or event.get('lat') is None:
+            return True
+        lat, lng, radius_km = self.area
+        return calculate_distance(lat, lng, event['lat'], event['lng']) <= radius_km
+
+    def offer(self, event):
+        with self.lock:
+            if len(self.pending) == self.pending.maxlen:
+                self.dropped += 1
+            self.pending.append(event)
+        self.notify()
+
+    def drain(self):
+        """Take the pending events and the number dropped since the last drain"""
+        with self.lock:
+            events = list(self.pending)
+            self.pending.clear()
+            dropped, self.dropped = self.dropped, 0
+            self.ready.clear()
+        return events, dropped
+
+class EventFeed:
+    """Fans alerts and hotspot changes out to streaming clients.
+
+    With a Redis client, events go through pub/sub so clients connected
+    to any worker see what every worker raises.
+    """
+
+    def __init__(self, client=None, channel='tracking:events'):
+        self.client = client
+        self.channel = channel
+        self.clients = set()
+        self.lock = threading.Lock()
+        self.sequence = itertools.count(1)
+        self.dropped = 0
+        if client is not None:
+            threading.Thread(target=self.listen, name='event-feed', daemon=True).start()
+
+    def subscribe(self, max_pending, area=None, notify=None):
+        stream = StreamClient(max_pending, area, notify)
+        with self.lock:
+            self.clients.add(stream)
+        return stream
+
+    def unsubscribe(self, stream):
+        with self.lock:
+            self.clients.discard(stream)
+
+    def publish(self, event_type, data, lat=None, lng=None):
+        event = {'type': event_type, 'data': data, 'lat': lat, 'lng': lng}
+        if self.client is not None:
+            try:
+                self.client.publish(self.channel, json.dumps(event))
+                return
+            except Exception as e:
+                print(f"Event relay error: {e}")
+        self.deliver(event)
+
+    def deliver(self, event):
+        event['id'] = next(self.sequence)
+        with self.lock:
+            clients = list(self.clients)
+        for stream in clients:
+            if stream.wants(event):
+                stream.offer(event)
+
+    def listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message:
+                        self.deliver(json.loads(message['data']))
+            except Exception as e:
+                print(f"Event feed error: {e}")
+                time.sleep(1)
+
+    def stats(self):
+        with self.lock:
+            clients = list(self.clients)
+        return {
+            'clients': len(clients),
+            'backlog': sum(len(stream.pending) for stream in clients)
+        }
 
-        for j, loc2 in enumerate(locations):
-            if loc2['user_id'] in processed:
+event_feed = EventFeed(tracking_redis)
+
+class HotspotScheduler(threading.Thread):
+    """Background worker that folds location updates into hotspots.
+
+    A pass runs every `interval` seconds, or sooner once `dirty_limit`
+    tourists have moved since the last one. With a HotspotSync only the
+    leader worker runs passes, and moved tourists are queued in Redis.
+    """
+
+    def __init__(self, interval, dirty_limit, sync=None):
+        super().__init__(name='hotspot-scheduler', daemon=True)
+        self.interval = interval
+        self.dirty_limit = dirty_limit
+        self.sync = sync
+        self.dirty = set()
+        self.dirty_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.reported = {}  # {hotspot_id: hotspot} as last streamed
+
+    def mark_dirty(self, user_id):
+        if self.sync is not None:
+            self.sync.mark_dirty(user_id)
+            return
+        with self.dirty_lock:
+            self.dirty.add(user_id)
+            pending = len(self.dirty)
+        if pending >= self.dirty_limit:
+            self.wake.set()
+
+    def run_pass(self):
+        """Apply pending location updates and expire stale tracking data"""
+        if self.sync is not None:
+            if not self.sync.lead():
+                behavior_history.expire()
+                return
+            dirty = self.sync.take_dirty()
+            for user_id, name, hotspot_id in self.sync.take_joins():
+                with hotspot_lock:
+                    _add_to_hotspot(user_id, name, hotspot_id)
+        else:
+            with self.dirty_lock:
+                dirty, self.dirty = self.dirty, set()
+
+        # Take the lock per tourist so location pings never wait on a whole pass
+        for user_id in dirty:
+            with hotspot_lock:
+                update_hotspots_for(user_id)
+
+        expire_tracking_data()
+        if self.sync is not None:
+            self.sync.publish()
+        self.report_changes()
+
+    def report_changes(self):
+        """Stream the hotspots formed, changed or dissolved since the last pass"""
+        with hotspot_lock:
+            current = {hotspot_id: dict(hotspot, tourists=list(hotspot['tourists']))
+                       for hotspot_id, hotspot in hotspots.items()}
+
+        for hotspot_id, hotspot in current.items():
+            old = self.reported.get(hotspot_id)
+            if old is None:
+                action = 'formed'
+            elif (old['tourist_count'], old['lat'], old['lng']) != (hotspot['tourist_count'], hotspot['lat'], hotspot['lng']):
+                action = 'updated'
+            else:
                 continue
+            event_feed.publish('hotspot', {'action': action, 'hotspot': hotspot}, hotspot['lat'], hotspot['lng'])
 
-            distance = calculate_distance(loc1['lat'], loc1['lng'], loc2['lat'], loc2['lng'])
-            if distance <= 0.5:  # 500 meters
-                cluster.append(loc2)
-                processed.add(loc2['user_id'])
-
-        if len(cluster) >= 3:  # Minimum 3 tourists for a hotspot
-            # Calculate cluster center
-            avg_lat = sum(loc['lat'] for loc in cluster) / len(cluster)
-            avg_lng = sum(loc['lng'] for loc in cluster) / len(cluster)
-
-            hotspot = {
-                'id': f"hotspot_{len(clusters) + 1}",
-                'lat': avg_lat,
-                'lng': avg_lng,
-                'tourist_count': len(cluster),
-                'tourists': [{'name': loc['name'], 'user_id': loc['user_id']} for loc in cluster],
-                'created_at': datetime.now().isoformat(),
-                'radius': 500  # meters
-            }
-            clusters.append(hotspot)
+        for hotspot_id, old in self.reported.items():
+            if hotspot_id not in current:
+                event_feed.publish('hotspot', {'action': 'dissolved', 'hotspot': {'id': hotspot_id}},
+                                   old['lat'], old['lng'])
 
-    hotspots = clusters
-    return hotspots
+        self.reported = current
 
-def update_tourist_location(user_id, lat, lng, name="Anonymous Tourist"):
-    """Update a tourist's location for hotspot detection"""
-    tourist_locations[user_id] = {
-        'lat': lat,
-        'lng': lng,
-        'timestamp': datetime.now().isoformat(),
-        'name': name
-    }
+    def run(self):
+        while True:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            try:
+                self.run_pass()
+            except Exception as e:
+                print(f"Hotspot scheduler error: {e}")
 
-    # Detect new hotspots after location update
-    detect_hotspots()
+hotspot_scheduler = HotspotScheduler(HOTSPOT_REFRESH_SECONDS, HOTSPOT_DIRTY_LIMIT, hotspot_sync)
+hotspot_scheduler.start()
+if hotspot_sync is not None:
+    hotspot_sync.start()
 
 @app.route('/api/tourist-attractions')
 def get_tourist_attractions():
@@ -1136,6 +3138,114 @@ def get_tourist_community():
 
     return jsonify({'tourists': nearby_tourists})
 
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one execution"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}  # {key: Future}
+
+    def do(self, key, fn):
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = self.calls[key] = Future()
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+
+class RateLimiter:
+    """Spaces calls at least `interval` seconds apart, queueing callers in arrival order"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def reserve(self, max_delay):
+        """Claim the next free slot and return the wait for it, or None if that is over max_delay"""
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            if slot - now > max_delay:
+                return None
+            self.next_slot = slot + self.interval
+            return slot - now
+
+    def wait(self, max_delay):
+        """Block until the caller's slot comes up; False if the queue is too long"""
+        delay = self.reserve(max_delay)
+        if delay is None:
+            return False
+        if delay > 0:
+            time.sleep(delay)
+        return True
+
+    def back_off(self, seconds):
+        """Hold every slot for at least `seconds`, e.g. after the upstream asks us to slow down"""
+        with self.lock:
+            self.next_slot = max(self.next_slot, time.monotonic() + seconds)
+
+class GeocoderBusy(Exception):
+    """Raised when the Nominatim queue is too long to wait for a slot, or Nominatim is throttling us"""
+
+geocode_cache = make_cache('geocode', GEOCODE_CACHE_TTL_SECONDS, GEOCODE_CACHE_SIZE)
+geocode_flights = SingleFlight()
+nominatim_limiter = RateLimiter(NOMINATIM_MIN_INTERVAL)
+
+def geocode(query):
+    """Nominatim results for a query, cached and shared between concurrent callers"""
+    key = normalize_location(query)
+    data = geocode_cache.get(key)
+    if data is None:
+        data = geocode_flights.do(key, lambda: fetch_geocode(query, key))
+    return data
+
+def fetch_geocode(query, key):
+    """Call Nominatim within its rate limit and cache the answer"""
+    if not nominatim_limiter.wait(NOMINATIM_MAX_QUEUE_SECONDS):
+        raise GeocoderBusy('Geocoding service is busy, please try again shortly')
+
+    # One attempt per slot: retries inside the client would skip the rate limit
+    response = upstream.get(NOMINATIM_API_URL, params=geocode_params(query), retry=False)
+    check_geocode_throttling(response)
+    data = response.json()
+    cache_geocode(key, data)
+    return data
+
+def check_geocode_throttling(response):
+    """Back off for Retry-After and raise GeocoderBusy when Nominatim throttles a request"""
+    if response.status_code not in (429, 503):
+        return
+    try:
+        delay = float(response.headers.get('Retry-After', NOMINATIM_MIN_INTERVAL))
+    except ValueError:  # An HTTP date; fall back to the usual spacing
+        delay = NOMINATIM_MIN_INTERVAL
+    nominatim_limiter.back_off(min(max(delay, NOMINATIM_MIN_INTERVAL), NOMINATIM_MAX_QUEUE_SECONDS))
+    raise GeocoderBusy('Geocoding service is busy, please try again shortly')
+
+def geocode_params(query):
+    return {
+        'format': 'json',
+        'q': query,
+        'limit': 1
+    }
+
+def cache_geocode(key, data):
+    geocode_cache.set(key, data, None if data else GEOCODE_NOT_FOUND_TTL_SECONDS)
+
 @app.route('/api/search')
 def search_location():
     query = request.args.get('q', '')
@@ -1143,27 +3253,21 @@ def search_location():
         return jsonify({'error': 'Search query required'}), 400
 
     try:
-        params = {
-            'format': 'json',
-            'q': query,
-            'limit': 1
-        }
+        # Look up Wikipedia page information while geocoding
+        started = time.monotonic()
+        wiki_future = upstream_pool.submit(get_wikipedia_info, query)
 
-        response = requests.get(NOMINATIM_API_URL, params=params, headers={
-            'User-Agent': 'Tourist-Safety-Portal/1.0'
-        })
-        data = response.json()
+        data = geocode(query)
 
         if data:
-            result = data[0]
-            location_data = {
-                'lat': float(result['lat']),
-                'lng': float(result['lon']),
-                'display_name': result['display_name']
-            }
-
-            # Get Wikipedia page information
-            wiki_data = get_wikipedia_info(query)
+            location_data = build_location_data(data[0])
+
+            # Wikipedia only gets until the soft deadline; a late answer
+            # still lands in the cache for the next search
+            try:
+                wiki_data = wiki_future.result(timeout=max(0, started + WIKI_SEARCH_DEADLINE - time.monotonic()))
+            except Exception:
+                wiki_data = None
             if wiki_data:
                 location_data['wikipedia'] = wiki_data
 
@@ -1171,22 +3275,35 @@ def search_location():
         else:
             return jsonify({'error': 'Location not found'}), 404
 
+    except GeocoderBusy as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def build_location_data(result):
+    """Shape a Nominatim result for the frontend"""
+    return {
+        'lat': float(result['lat']),
+        'lng': float(result['lon']),
+        'display_name': result['display_name']
+    }
+
 @app.route('/api/ratings', methods=['GET', 'POST'])
 def handle_ratings():
     if request.method == 'POST':
-        data = request.get_json()
-        rating = {
-            'lat': data['lat'],
-            'lng': data['lng'],
-            'rating': data['rating'],
-            'timestamp': datetime.now().isoformat()
-        }
-        ratings.append(rating)
+        data = request.get_json(silent=True) or {}
+        try:
+            lat, lng = float(data['lat']), float(data['lng'])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'error': 'Numeric lat and lng required'}), 400
+        score = data.get('rating')
+        if not is_valid_score(score):
+            return jsonify({'error': f'Rating must be a whole number from {RATING_MIN} to {RATING_MAX}'}), 400
+        record_rating(lat, lng, score)
         return jsonify({'success': True})
 
+    sync_ratings()
+
     # Check if location-specific ratings are requested
     lat = request.args.get('lat', type=float)
     lng = request.args.get('lng', type=float)
@@ -1194,14 +3311,10 @@ def handle_ratings():
 
     if lat is not None and lng is not None:
         # Return ratings within radius of specified location
-        nearby_ratings = []
-        for rating in ratings:
-            distance = calculate_distance(lat, lng, rating['lat'], rating['lng'])
-            if distance <= radius:
-                nearby_ratings.append(rating['rating'])
-
-        if nearby_ratings:
-            avg_rating = sum(nearby_ratings) / len(nearby_ratings)
+        nearby_ratings = ratings.scores[ratings.within(lat, lng, radius)]
+
+        if len(nearby_ratings):
+            avg_rating = float(nearby_ratings.mean())
             return jsonify({
                 'average_rating': round(avg_rating, 1),
                 'total_ratings': len(nearby_ratings),
@@ -1217,67 +3330,232 @@ def handle_ratings():
                 'message': 'No ratings found in this area'
             })
 
-    # Return all ratings for map display (grouped by proximity)
-    return jsonify(get_grouped_ratings())
+    # Return aggregated rating cells for map display
+    zoom = request.args.get('zoom', default=RATING_DEFAULT_ZOOM, type=int)
+    bbox = request.args.get('bbox')
+    if bbox:
+        try:
+            west, south, east, north = (float(v) for v in bbox.split(','))
+        except ValueError:
+            return jsonify({'error': 'bbox must be west,south,east,north'}), 400
+        return jsonify(rating_tiles.query(zoom, west, south, east, north))
+    return jsonify(rating_tiles.query(zoom))
+
+class Rollup:
+    """Counters summed into fixed time buckets, for dashboard trend charts.
+
+    Keeps the last `buckets` buckets of `width` seconds in a ring; a slot
+    is reset when a newer bucket reuses it, and counts for buckets that
+    have already rolled out are dropped.
+    """
+
+    def __init__(self, width, buckets, fields):
+        self.width = width
+        self.fields = fields
+        self.index = {field: i for i, field in enumerate(fields)}
+        self.slots = [[0] * len(fields) for _ in range(buckets)]
+        self.slot_buckets = [None] * buckets  # Bucket number each slot currently holds
+        self.lock = threading.Lock()
+
+    def add(self, field, amount=1, timestamp=None):
+        now = time.time()
+        bucket = int((now if timestamp is None else timestamp) // self.width)
+        if bucket <= int(now // self.width) - len(self.slots):
+            return
+        slot = bucket % len(self.slots)
+        with self.lock:
+            held = self.slot_buckets[slot]
+            if held != bucket:
+                if held is not None and held > bucket:
+                    return
+                self.slot_buckets[slot] = bucket
+                self.slots[slot] = [0] * len(self.fields)
+            self.slots[slot][self.index[field]] += amount
+
+    def series(self):
+        """Every kept bucket, oldest first, as {'start', field: total, ...}"""
+        newest = int(time.time() // self.width)
+        result = []
+        with self.lock:
+            for bucket in range(newest - len(self.slots) + 1, newest + 1):
+                slot = bucket % len(self.slots)
+                values = self.slots[slot] if self.slot_buckets[slot] == bucket else [0] * len(self.fields)
+                point = dict(zip(self.fields, values))
+                point['start'] = datetime.fromtimestamp(bucket * self.width).isoformat()
+                result.append(point)
+        return result
+
+TREND_FIELDS = ('ratings', 'rating_sum', 'verifications', 'fixes', 'alerts')
+trends = {
+    'minute': Rollup(60, TREND_MINUTES, TREND_FIELDS),
+    'hour': Rollup(3600, TREND_HOURS, TREND_FIELDS)
+}
 
-def calculate_distance(lat1, lng1, lat2, lng2):
-    """Calculate distance between two points in kilometers"""
-    from math import radians, sin, cos, sqrt, atan2
+def count_trend(field, amount=1, timestamp=None):
+    """Add to a dashboard trend counter in every rollup"""
+    for rollup in trends.values():
+        rollup.add(field, amount, timestamp)
+
+RATING_MIN = 1
+RATING_MAX = 5
+
+def is_valid_score(score):
+    """Whether a submitted rating is a whole number of stars, such as 4 or 4.0; bools don't count"""
+    if type(score) is float and score.is_integer():
+        score = int(score)
+    return type(score) is int and RATING_MIN <= score <= RATING_MAX
+
+def record_rating(lat, lng, score, timestamp=None):
+    """Fold a rating into the map aggregates, then store it"""
+    score = int(score)  # A whole-number float such as 4.0 is stored as 4
+    timestamp = int(time.time()) if timestamp is None else int(timestamp)
+    # Index first, so a rating the index rejects never reaches the database
+    index_rating(lat, lng, score, timestamp)
+    storage.add_rating(lat, lng, score, timestamp)
+
+def index_rating(lat, lng, score, timestamp):
+    ratings.append(lat, lng, score, timestamp)
+    rating_tiles.add(lat, lng, score)
+    count_trend('ratings', 1, timestamp)
+    count_trend('rating_sum', score, timestamp)
+
+def sync_ratings():
+    """Fold in ratings other workers have stored since the last sync"""
+    for row in storage.new_ratings():
+        lat, lng, score, timestamp = row
+        # A bad row must not stop the rest from loading, or the app from starting
+        if not is_valid_score(score):
+            print(f"Skipping unreadable rating row: {row}")
+            continue
+        try:
+            index_rating(lat, lng, int(score), timestamp)
+        except (TypeError, ValueError, OverflowError) as e:
+            print(f"Skipping unreadable rating row {row}: {e}")
+
+sync_ratings()  # Load the ratings stored before this process started
 
-    R = 6371  # Earth's radius in kilometers
+EARTH_RADIUS_KM = 6371
 
-    lat1_rad = radians(lat1)
-    lng1_rad = radians(lng1)
-    lat2_rad = radians(lat2)
-    lng2_rad = radians(lng2)
+def calculate_distance(lat1, lng1, lat2, lng2):
+    """Calculate distance between two points in kilometers"""
+    lat1_rad = math.radians(lat1)
+    lng1_rad = math.radians(lng1)
+    lat2_rad = math.radians(lat2)
+    lng2_rad = math.radians(lng2)
 
     dlat = lat2_rad - lat1_rad
     dlng = lng2_rad - lng1_rad
 
-    a = sin(dlat/2)**2 + cos(lat1_rad) * cos(lat2_rad) * sin(dlng/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1-a))
+    a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlng/2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
 
-    return R * c
+    return EARTH_RADIUS_KM * c
 
-def get_grouped_ratings():
-    """Group ratings by proximity (5km radius) and calculate averages"""
-    if not ratings:
-        return []
+def haversine_km(lat, lng, lats, lngs):
+    """Distances in kilometers from one point to arrays of points"""
+    lat_rad = np.radians(lat)
+    lats_rad = np.radians(np.asarray(lats, dtype=np.float64))
+    dlat = lats_rad - lat_rad
+    dlng = np.radians(np.asarray(lngs, dtype=np.float64)) - np.radians(lng)
 
-    grouped_ratings = []
-
-    for rating in ratings:
-        # Check if this rating is already grouped
-        found_group = False
-        for group in grouped_ratings:
-            distance = calculate_distance(
-                rating['lat'], rating['lng'],
-                group['lat'], group['lng']
-            )
-            if distance <= 5:  # 5km radius
-                # Add to existing group
-                group['ratings'].append(rating['rating'])
-                group['count'] = len(group['ratings'])
-                group['rating'] = round(sum(group['ratings']) / len(group['ratings']), 1)
-                found_group = True
-                break
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat_rad) * np.cos(lats_rad) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
 
-        if not found_group:
-            # Create new group
-            grouped_ratings.append({
-                'lat': rating['lat'],
-                'lng': rating['lng'],
-                'rating': rating['rating'],
-                'count': 1,
-                'ratings': [rating['rating']]
-            })
+def unit_vectors(lats, lngs):
+    """Convert coordinates to 3D points on the unit sphere"""
+    lats_rad = np.radians(lats)
+    lngs_rad = np.radians(lngs)
+    cos_lats = np.cos(lats_rad)
+    return np.stack((cos_lats * np.cos(lngs_rad), cos_lats * np.sin(lngs_rad), np.sin(lats_rad)), axis=-1)
 
-    return grouped_ratings
+def alert_query(args):
+    """AlertQuery from ?type=, ?since=, ?until= (ISO timestamps) and ?lat=&lng=&radius="""
+    types = [t for value in args.getlist('type') for t in value.split(',') if t]
+    try:
+        since = datetime.fromisoformat(args['since']).timestamp() if args.get('since') else None
+        until = datetime.fromisoformat(args['until']).timestamp() if args.get('until') else None
+    except ValueError:
+        raise ValueError('since and until must be ISO timestamps')
+    return AlertQuery(types, since, until, stream_area(args))
 
+ALERT_PAGE_PARAMS = ('limit', 'before', 'type', 'since', 'until', 'lat', 'lng', 'radius')
 
 @app.route('/api/alerts')
 def get_alerts():
-    return jsonify(alerts[-10:])  # Last 10 alerts
+    """Alert history, newest first, one page at a time.
+
+    Filter with ?type=sos,weather_alert, ?since=/?until= and ?lat=&lng=&radius=,
+    then pass the returned `next` back as ?before= for the following page.
+    Without any of those the old response stays: a bare list of the last
+    10 alerts, oldest first.
+    """
+    if not any(param in request.args for param in ALERT_PAGE_PARAMS):
+        return jsonify(storage.recent_alerts(ALERT_LEGACY_SIZE))
+    try:
+        query = alert_query(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    limit = min(max(request.args.get('limit', ALERT_PAGE_SIZE, type=int), 1), ALERT_PAGE_MAX)
+
+    page = storage.query_alerts(query, request.args.get('before', type=int), limit + 1)
+    more = len(page) > limit
+    page = page[:limit]
+    return jsonify({
+        'alerts': [dict(alert, id=alert_id) for alert_id, alert in page],
+        'next': page[-1][0] if more else None
+    })
+
+@app.route('/api/stream')
+def stream_events():
+    """Server-sent events for new alerts and hotspot changes.
+
+    Pass lat, lng and radius (km) to only get events from that area;
+    events without a position always go out.
+    """
+    try:
+        area = stream_area(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    stream = event_feed.subscribe(STREAM_QUEUE_SIZE, area)
+
+    def generate():
+        try:
+            yield SSE_PREAMBLE
+            while True:
+                stream.ready.wait(STREAM_KEEPALIVE_SECONDS)
+                yield ''.join(stream_chunks(stream))
+        finally:
+            event_feed.unsubscribe(stream)
+
+    return Response(generate(), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+SSE_PREAMBLE = 'retry: 5000\n\n'  # Browsers reconnect after 5s
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+def stream_area(args):
+    """(lat, lng, radius_km) from query args, or None when no area is given"""
+    lat = args.get('lat', type=float)
+    lng = args.get('lng', type=float)
+    radius = args.get('radius', type=float)
+    if lat is None and lng is None and radius is None:
+        return None
+    if lat is None or lng is None or radius is None or radius <= 0:
+        raise ValueError('lat, lng and a positive radius are needed to filter by area')
+    return lat, lng, radius
+
+def sse_message(event_type, data, event_id=None):
+    message = f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+    return f"id: {event_id}\n{message}" if event_id is not None else message
+
+def stream_chunks(stream):
+    """Drain a client's queue into SSE messages, or a keepalive comment if nothing is pending"""
+    events, dropped = stream.drain()
+    chunks = []
+    if dropped:
+        chunks.append(sse_message('dropped', {'count': dropped}))
+    chunks.extend(sse_message(event['type'], event['data'], event['id']) for event in events)
+    return chunks or [': keepalive\n\n']
 
 @app.route('/api/behavior', methods=['POST'])
 def update_behavior():
@@ -1287,144 +3565,179 @@ def update_behavior():
     lng = data['lng']
     name = data.get('name', 'Anonymous Tourist')
 
-    if user_id not in behavior_history:
-        behavior_history[user_id] = []
-
-    behavior_history[user_id].append({
-        'lat': lat,
-        'lng': lng,
-        'timestamp': datetime.now().isoformat()
-    })
-
-    # Keep only last 50 positions
-    if len(behavior_history[user_id]) > 50:
-        behavior_history[user_id] = behavior_history[user_id][-50:]
+    behavior_history.record(user_id, [(lat, lng, time.time())])
+    count_trend('fixes')
 
     # Update tourist location for hotspot detection
     update_tourist_location(user_id, lat, lng, name)
 
     return jsonify({'success': True})
 
+def is_valid_position(lat, lng):
+    """Whether (lat, lng) are finite coordinates on the globe"""
+    return math.isfinite(lat) and math.isfinite(lng) and -90 <= lat <= 90 and -180 <= lng <= 180
+
+def parse_traces(data):
+    """(user_id, name, positions) for each non-empty trace in a batch body.
+
+    Raises ValueError, naming the problem, if any part of the batch is malformed.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Expected a JSON object')
+    traces = data.get('traces', [data])
+    if not isinstance(traces, list) or not all(isinstance(trace, dict) for trace in traces):
+        raise ValueError('traces must be a list of objects')
+
+    parsed = []
+    total = 0
+    now = time.time()
+    for trace in traces:
+        fixes = trace.get('fixes', [])
+        if not isinstance(fixes, list):
+            raise ValueError('fixes must be a list')
+        total += len(fixes)
+        if total > BEHAVIOR_BATCH_MAX_FIXES:
+            raise ValueError(f'At most {BEHAVIOR_BATCH_MAX_FIXES} fixes per batch')
+        user_id = trace.get('user_id', 'anonymous')
+        if not isinstance(user_id, str) or not user_id:
+            raise ValueError('user_id must be a non-empty string')
+        if not fixes:
+            continue
+        try:
+            positions = [(
+                float(fix['lat']),
+                float(fix['lng']),
+                datetime.fromisoformat(fix['timestamp']).timestamp() if fix.get('timestamp') else now
+            ) for fix in fixes]
+        except (AttributeError, KeyError, TypeError, ValueError):
+            raise ValueError('Each fix needs numeric lat and lng and an ISO timestamp')
+        if not all(is_valid_position(lat, lng) for lat, lng, _ in positions):
+            raise ValueError('lat must be within -90..90 and lng within -180..180')
+        parsed.append((user_id, trace.get('name', 'Anonymous Tourist'), positions))
+    return parsed
+
+@app.route('/api/behavior/batch', methods=['POST'])
+def update_behavior_batch():
+    """Ingest buffered position fixes for one tourist or many.
+
+    Accepts {'user_id', 'name', 'fixes': [{'lat', 'lng', 'timestamp'}, ...]}
+    or {'traces': [that, ...]}. Each tourist's history is extended once and
+    only their latest fix moves them for hotspot detection.
+    """
+    try:
+        traces = parse_traces(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Nothing is written until the whole batch has parsed, so a rejected
+    # batch can be retried without recording any fix twice
+    updates = []
+    total = 0
+    for user_id, name, positions in traces:
+        behavior_history.record(user_id, positions)
+        total += len(positions)
+        lat, lng, _ = positions[-1]
+        updates.append((user_id, lat, lng, name))
+    count_trend('fixes', total)
+
+    update_tourist_locations(updates)
+    return jsonify({'success': True, 'users': len(updates), 'fixes': total})
+
+NON_WORD = re.compile(r'[\W_]+')
+
+class LanguageResolver:
+    """Find the language for a free-form place name in one pass over its words.
+
+    Every known city, region, country, demonym and language name goes into an
+    Aho-Corasick automaton whose alphabet is words, so names only ever match
+    whole words. A lookup normalizes the text and walks it once, keeping the
+    longest name found (the first one on a tie), so "Paris, Texas, United
+    States" resolves by "united states" and "Ontario" no longer matches "rio".
+    Text that matches no whole name falls back to the city it is the start
+    of, so half-typed searches like "kuala" still resolve.
+    """
+
+    def __init__(self, languages, aliases, default):
+        self.default = default
+        self.goto = [{}]  # Trie edges per node, keyed by word
+        self.fail = [0]
+        self.match = [None]  # Longest (word count, language) ending at each node
+        self.completions = {}
+
+        names = dict(languages)
+        # Aliases pointing at a city without an entry fall back to the default
+        names.update((name, languages.get(city, default)) for name, city in aliases.items())
+        for name, language in names.items():
+            self._add(self.normalize(name).split(), language)
+        for name, language in languages.items():
+            words = self.normalize(name).split()
+            for start in range(len(words)):
+                suffix = ' '.join(words[start:])
+                for end in range(1, len(suffix) + 1):
+                    self.completions.setdefault(suffix[:end], language)
+        self._link()
+
+    @staticmethod
+    def normalize(text):
+        """Lowercase, strip accents and collapse punctuation into single spaces"""
+        text = text.lower()
+        if not text.isascii():
+            text = unicodedata.normalize('NFKD', text)
+            text = ''.join(c for c in text if not unicodedata.combining(c))
+        return NON_WORD.sub(' ', text).strip()
+
+    def _add(self, words, language):
+        node = 0
+        for word in words:
+            child = self.goto[node].get(word)
+            if child is None:
+                child = len(self.goto)
+                self.goto[node][word] = child
+                self.goto.append({})
+                self.fail.append(0)
+                self.match.append(None)
+            node = child
+        self.match[node] = (len(words), language)
+
+    def _link(self):
+        """Breadth-first failure links, folding each node's suffix matches into it"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for word, child in self.goto[node].items():
+                state = self.fail[node]
+                while state and word not in self.goto[state]:
+                    state = self.fail[state]
+                link = self.goto[state].get(word, 0)
+                self.fail[child] = link if link != child else 0
+                inherited = self.match[self.fail[child]]
+                if inherited and (self.match[child] is None or inherited[0] > self.match[child][0]):
+                    self.match[child] = inherited
+                queue.append(child)
+
+    def resolve(self, location_name):
+        """Language details for a place name, English when nothing matches"""
+        text = self.normalize(location_name)
+        best = None
+        node = 0
+        goto, fail, match = self.goto, self.fail, self.match
+        for word in text.split():
+            while node and word not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(word, 0)
+            found = match[node]
+            if found and (best is None or found[0] > best[0]):
+                best = found
+
+        if best is not None:
+            return best[1]
+        return self.completions.get(text, self.default)
+
+language_resolver = LanguageResolver(LOCAL_LANGUAGES, {**LOCATION_ALIASES, **LANGUAGE_KEYWORDS}, DEFAULT_LANGUAGE)
+
 def get_location_language(location_name):
     """Get local language information for a location"""
-    location_lower = location_name.lower().strip()
-
-    # Normalize common location names
-    location_mappings = {
-        'japan': 'tokyo',  # Map country to major city
-        'japanese': 'tokyo',
-        'india': 'delhi',
-        'indian': 'delhi',
-        'france': 'paris',
-        'french': 'paris',
-        'china': 'beijing',
-        'chinese': 'beijing',
-        'russia': 'moscow',
-        'russian': 'moscow',
-        'turkey': 'istanbul',
-        'turkish': 'istanbul',
-        'egypt': 'cairo',
-        'egyptian': 'cairo',
-        'brazil': 'rio',
-        'brazilian': 'rio',
-        'uae': 'dubai',
-        'united arab emirates': 'dubai',
-        'arab': 'dubai',
-        'australia': 'sydney',
-        'australian': 'sydney',
-        'uk': 'london',
-        'united kingdom': 'london',
-        'british': 'london',
-        'usa': 'new york',
-        'united states': 'new york',
-        'america': 'new york',
-        'american': 'new york',
-        'italy': 'rome',
-        'italian': 'rome',
-        'spain': 'barcelona',
-        'spanish': 'barcelona',
-        'netherlands': 'amsterdam',
-        'dutch': 'amsterdam',
-        'germany': 'berlin',
-        'german': 'berlin',
-        'czech republic': 'prague',
-        'czech': 'prague',
-        'austria': 'vienna',
-        'austrian': 'vienna',
-        'thailand': 'bangkok',
-        'thai': 'bangkok',
-        'south korea': 'seoul',
-        'korean': 'seoul',
-        'hong kong': 'hong kong',
-        'china': 'beijing',
-        'malaysia': 'kuala lumpur',
-        'malay': 'kuala lumpur',
-        'mexico': 'mexico city',
-        'mexican': 'mexico city',
-        'canada': 'toronto',
-        'canadian': 'toronto',
-        'brazil': 'sao paulo',
-        'brazilian': 'sao paulo',
-        'argentina': 'buenos aires',
-        'argentinian': 'buenos aires',
-        'israel': 'jerusalem',
-        'hebrew': 'jerusalem',
-        'saudi arabia': 'riyadh',
-        'saudi': 'riyadh',
-        'south africa': 'cape town',
-        'african': 'cape town',
-        'kenya': 'nairobi',
-        'kenyan': 'nairobi',
-        'new zealand': 'auckland',
-        'zealand': 'auckland'
-    }
-
-    # Apply mapping if exists
-    if location_lower in location_mappings:
-        location_lower = location_mappings[location_lower]
-
-    # Direct match
-    if location_lower in LOCAL_LANGUAGES:
-        return LOCAL_LANGUAGES[location_lower]
-
-    # Partial match for city names
-    for key, data in LOCAL_LANGUAGES.items():
-        if key in location_lower or location_lower in key:
-            return data
-
-    # Try to match by language keywords
-    language_keywords = {
-        'hindi': 'delhi',
-        'marathi': 'mumbai',
-        'bengali': 'kolkata',
-        'tamil': 'chennai',
-        'telugu': 'hyderabad',
-        'kannada': 'bangalore',
-        'gujarati': 'ahmedabad',
-        'rajasthani': 'jaipur',
-        'french': 'paris',
-        'english': 'london',
-        'japanese': 'tokyo',
-        'mandarin': 'beijing',
-        'chinese': 'beijing',
-        'russian': 'moscow',
-        'arabic': 'dubai',
-        'turkish': 'istanbul',
-        'portuguese': 'rio'
-    }
-
-    for keyword, city in language_keywords.items():
-        if keyword in location_lower:
-            return LOCAL_LANGUAGES[city]
-
-    # Default to English for unknown locations
-    return {
-        'language': 'English',
-        'code': 'en',
-        'script': 'Latin',
-        'greeting': 'Hello',
-        'thank_you': 'Thank you'
-    }
+    return language_resolver.resolve(location_name)
 
 def get_tourist_phrases(language_code):
     """Get tourist phrases for a language"""
@@ -1446,38 +3759,109 @@ def get_tourist_phrases(language_code):
         'hotel': 'Hotel'
     }
 
-@app.route('/api/language/<location>')
-def get_location_language_info(location):
-    """Get language information for a location"""
-    language_info = get_location_language(location)
-    phrases = get_tourist_phrases(language_info['code'])
+class ReferenceResponseCache:
+    """Serialized JSON responses for endpoints that only read constant tables.
+
+    Each body is serialized once, on first use or by warm(), and kept with a
+    strong ETag of its bytes. Requests get those bytes with Cache-Control
+    set, or a bodiless 304 when their If-None-Match already names the ETag.
+    The least recently used bodies go once there are `max_entries`.
+    """
+
+    def __init__(self, max_entries, max_age):
+        self.max_entries = max_entries
+        self.cache_control = f"public, max-age={max_age}"
+        self.entries = OrderedDict()  # {key: (body, etag, headers)}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def _entry(self, key, build):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        body = app.json.response(build()).get_data()  # The exact bytes jsonify would send
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        entry = (body, etag, [('Content-Type', 'application/json'), ('ETag', f'"{etag}"'),
+                              ('Cache-Control', self.cache_control)])
+        with self.lock:
+            self.misses += 1
+            self.entries[key] = entry
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+    def warm(self, key, build):
+        self._entry(key, build)
+
+    def respond(self, key, build):
+        body, etag, headers = self._entry(key, build)
+        if request.if_none_match.contains_weak(etag):  # If-None-Match compares weakly
+            self.not_modified += 1
+            return Response(status=304, headers=Headers(headers[1:]))
+        return Response(body, headers=Headers(headers))
+
+    def stats(self):
+        return {
+            'size': len(self.entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified
+        }
 
-    return jsonify({
+language_responses = ReferenceResponseCache(REFERENCE_CACHE_SIZE, REFERENCE_MAX_AGE)
+
+def location_language_body(location):
+    language_info = get_location_language(location)
+    return {
         'location': location,
         'language': language_info,
-        'phrases': phrases
-    })
+        'phrases': get_tourist_phrases(language_info['code'])
+    }
+
+@app.route('/api/language/<location>')
+def get_location_language_info(location):
+    """Get language information for a location"""
+    return language_responses.respond(('location', location), lambda: location_language_body(location))
 
 @app.route('/api/language/phrases/<language_code>')
 def get_language_phrases(language_code):
     """Get tourist phrases for a specific language"""
-    phrases = get_tourist_phrases(language_code)
-    return jsonify({'phrases': phrases})
+    return language_responses.respond(('phrases', language_code),
+                                      lambda: {'phrases': get_tourist_phrases(language_code)})
+
+def warm_language_responses():
+    """Serialize every phrase list up front, since they are all known at startup"""
+    for code in TOURIST_PHRASES:
+        language_responses.warm(('phrases', code), lambda: {'phrases': get_tourist_phrases(code)})
+
+warm_language_responses()
 
 @app.route('/api/dashboard')
 def get_dashboard_data():
-    active_tourists = len([u for u in users.values() if u.get('verified', False)])
-    recent_alerts = alerts[-5:]
-
-    # Calculate safety heatmap data
-    if ratings:
-        avg_rating = sum(r['rating'] for r in ratings) / len(ratings)
-        low_safety = len([r for r in ratings if r['rating'] < 3])
-        high_safety = len([r for r in ratings if r['rating'] >= 4])
+    try:
+        query = alert_query(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    trend = request.args.get('trend')
+    if trend is not None and trend not in trends:
+        return jsonify({'error': f"trend must be one of: {', '.join(trends)}"}), 400
+
+    active_tourists = storage.count_verified_users()
+    if query:
+        recent_alerts = [alert for _, alert in reversed(storage.query_alerts(query, limit=5))]
     else:
-        avg_rating = 0
-        low_safety = 0
-        high_safety = 0
+        recent_alerts = storage.recent_alerts(5)
+    sync_ratings()
+
+    # Safety heatmap data from the rating store's running totals
+    total_rated, avg_rating, low_safety, high_safety = ratings.summary()
 
     dashboard_data = {
         'active_tourists': active_tourists,
@@ -1486,10 +3870,13 @@ def get_dashboard_data():
             'average_rating': round(avg_rating, 1),
             'low_safety_zones': low_safety,
             'high_safety_zones': high_safety,
-            'total_rated': len(ratings)
+            'total_rated': total_rated
         },
         'behavior_analysis': analyze_behavior_patterns()
     }
+    if trend is not None:
+        # Ratings count from every worker; the other counters from this one
+        dashboard_data['trend'] = trends[trend].series()
 
     return jsonify(dashboard_data)
 
@@ -1498,7 +3885,7 @@ def analyze_behavior_patterns():
     if not behavior_history:
         return {'status': 'No data available'}
 
-    total_movements = sum(len(history) for history in behavior_history.values())
+    total_movements = behavior_history.total_positions
     avg_movements = total_movements / len(behavior_history) if behavior_history else 0
 
     return {
@@ -1507,32 +3894,40 @@ def analyze_behavior_patterns():
         'status': 'Active monitoring'
     }
 
+@app.route('/api/metrics')
+def get_metrics():
+    """Report sizes, eviction and cache counters for the in-memory stores"""
+    return jsonify({
+        'tourist_locations': tourist_locations.stats(),
+        'behavior_history': behavior_history.stats(),
+        'hotspots': len(hotspots),
+        'weather_cache': weather_cache.stats(),
+        'wikipedia_cache': wiki_cache.stats(),
+        'geocode_cache': geocode_cache.stats(),
+        'storage': storage.stats(),
+        'event_stream': event_feed.stats(),
+        'alert_dedup': alert_deduper.stats(),
+        'language_responses': language_responses.stats()
+    })
+
 # Authentication Routes
 @app.route('/api/auth/register', methods=['POST'])
 def register():
     data = request.get_json()
     email = data['email']
 
-    if email in users:
+    user = storage.add_user(email, data['name'], generate_password_hash(data['password']),
+                            datetime.now().isoformat())
+    if user is None:
         return jsonify({'error': 'User already exists'}), 400
 
-    user_id = str(len(users) + 1)
-    users[email] = {
-        'id': user_id,
-        'name': data['name'],
-        'email': email,
-        'password': generate_password_hash(data['password']),
-        'verified': False,
-        'created_at': datetime.now().isoformat()
-    }
-
     # Generate verification code
     code = str(random.randint(100000, 999999))
-    verification_codes[email] = code
+    storage.set_verification_code(email, code)
 
     return jsonify({
         'message': f'Verification code sent to {email}: {code}',
-        'user_id': user_id
+        'user_id': user['id']
     })
 
 @app.route('/api/auth/verify', methods=['POST'])
@@ -1541,10 +3936,12 @@ def verify_email():
     email = data['email']
     code = data['code']
 
-    if email in verification_codes and verification_codes[email] == code:
-        if email in users:
-            users[email]['verified'] = True
-            del verification_codes[email]
+    stored_code = storage.get_verification_code(email)
+    if stored_code is not None and stored_code == code:
+        if storage.get_user(email):
+            storage.set_user_verified(email)
+            count_trend('verifications')
+            storage.delete_verification_code(email)
             return jsonify({'message': 'Email verified successfully'})
         else:
             return jsonify({'error': 'User not found'}), 404
@@ -1557,15 +3954,16 @@ def login():
     email = data['email']
     password = data['password']
 
-    if email in users and check_password_hash(users[email]['password'], password):
-        if users[email]['verified']:
-            session['user_id'] = users[email]['id']
+    user = storage.get_user(email)
+    if user and check_password_hash(user['password'], password):
+        if user['verified']:
+            session['user_id'] = user['id']
             session['user_email'] = email
             return jsonify({
                 'message': 'Login successful',
                 'user': {
-                    'id': users[email]['id'],
-                    'name': users[email]['name'],
+                    'id': user['id'],
+                    'name': user['name'],
                     'email': email
                 }
             })
@@ -1583,7 +3981,7 @@ def logout():
 def auth_status():
     if 'user_id' in session:
         email = session['user_email']
-        user = users.get(email)
+        user = storage.get_user(email)
         if user:
             return jsonify({
                 'logged_in': True,
@@ -1606,10 +4004,10 @@ def verify_blockchain_id():
     data = request.get_json()
     user_email = data.get('email')
 
-    if user_email not in users:
+    user = storage.get_user(user_email)
+    if user is None:
         return jsonify({'error': 'User not found'}), 404
 
-    user = users[user_email]
     user_data = {
         'id': user['id'],
         'name': user['name'],
@@ -1618,11 +4016,11 @@ def verify_blockchain_id():
     }
 
     current_hash = generate_blockchain_hash(user_data)
-    stored_hash = blockchain_hashes.get(user['id'])
+    stored_hash = storage.get_blockchain_hash(user['id'])
 
     if not stored_hash:
         # First verification - store hash
-        blockchain_hashes[user['id']] = current_hash
+        storage.set_blockchain_hash(user['id'], current_hash)
         return jsonify({
             'verified': True,
             'hash': current_hash,
@@ -1645,20 +4043,24 @@ def sos_alert():
         'location': data.get('location', 'Unknown'),
         'timestamp': datetime.now().isoformat()
     }
-    alerts.append(alert)
+    storage.add_alert(alert)
+    count_trend('alerts')
+    event_feed.publish('alert', alert, *alert_position(alert))
     return jsonify({'success': True, 'message': 'SOS alert sent'})
 
 @app.route('/api/hotspots')
 def get_hotspots():
     """Get all active tourist hotspots"""
-    return jsonify({'hotspots': hotspots})
+    with hotspot_lock:
+        return jsonify({'hotspots': list(hotspots.values())})
 
 @app.route('/api/hotspots/<hotspot_id>')
 def get_hotspot_details(hotspot_id):
     """Get details of a specific hotspot"""
-    hotspot = next((h for h in hotspots if h['id'] == hotspot_id), None)
-    if hotspot:
-        return jsonify(hotspot)
+    with hotspot_lock:
+        hotspot = hotspots.get(hotspot_id)
+        if hotspot:
+            return jsonify(hotspot)
     return jsonify({'error': 'Hotspot not found'}), 404
 
 @app.route('/api/hotspots/join/<hotspot_id>', methods=['POST'])
@@ -1668,16 +4070,22 @@ def join_hotspot(hotspot_id):
     user_id = data.get('user_id', 'anonymous')
     user_name = data.get('name', 'Anonymous Tourist')
 
-    hotspot = next((h for h in hotspots if h['id'] == hotspot_id), None)
-    if hotspot:
-        # Check if user is already in the hotspot
-        if not any(t['user_id'] == user_id for t in hotspot['tourists']):
-            hotspot['tourists'].append({'name': user_name, 'user_id': user_id})
-            hotspot['tourist_count'] = len(hotspot['tourists'])
-            return jsonify({'success': True, 'message': f'Joined hotspot with {hotspot["tourist_count"]} tourists!'})
-        else:
-            return jsonify({'success': False, 'message': 'Already joined this hotspot'})
-    return jsonify({'error': 'Hotspot not found'}), 404
+    with hotspot_lock:
+        hotspot = hotspots.get(hotspot_id)
+        if hotspot:
+            # Check if user is already in the hotspot
+            if hotspot_membership.get(user_id) != hotspot_id:
+                if hotspot_sync is not None:
+                    # The leader worker applies the join on its next pass
+                    hotspot_sync.queue_join(user_id, user_name, hotspot_id)
+                    tourist_count = hotspot['tourist_count'] + 1
+                else:
+                    _add_to_hotspot(user_id, user_name, hotspot_id)
+                    tourist_count = hotspot['tourist_count']
+                return jsonify({'success': True, 'message': f'Joined hotspot with {tourist_count} tourists!'})
+            else:
+                return jsonify({'success': False, 'message': 'Already joined this hotspot'})
+        return jsonify({'error': 'Hotspot not found'}), 404
 
 def check_weather_alerts(current_weather):
     alerts = []
@@ -1714,14 +4122,22 @@ def check_weather_alerts(current_weather):
 
     return alerts
 
-def log_alert(alert_type, message, data=None):
+def log_alert(alert_type, message, data=None, dedup_key=None):
+    """Store and stream an alert; with a dedup_key, repeats nearby only count as hits"""
     alert = {
         'type': alert_type,
         'message': message,
         'data': data,
         'timestamp': datetime.now().isoformat()
     }
-    alerts.append(alert)
+    if dedup_key is not None:
+        new, changed = alert_deduper.admit((alert_type, dedup_key), alert)
+        write_alert_hits(changed)
+        if not new:
+            return
+    storage.add_alert(alert)
+    count_trend('alerts')
+    event_feed.publish('alert', alert, *alert_position(alert))
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5050)
\ No newline at end of file
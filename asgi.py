@@ -0,0 +1,350 @@
+"""Async serving mode for the upstream-bound endpoints.
+
+Weather, search and tourist-attraction lookups spend nearly all their time
+waiting on Open-Meteo, Nominatim and Wikipedia. Here they run as Quart
+handlers on a non-blocking httpx client, so one process can hold thousands
+of upstream waits without a thread per request. The /api/stream event feed
+is served here too, for the same reason. Every other route is served by the
+regular Flask app from app.py, on a small thread pool.
+
+app.py's in-process caches and queued storage writes return at once and are
+called directly. The SQLite Wikipedia cache, and the caches and alert relay
+when they go through Redis (CACHE_REDIS_URL, TRACKING_REDIS_URL), wait on
+I/O, so those calls run on a worker thread instead of stalling the loop.
+
+This mode needs packages app.py does not: quart, httpx, uvicorn and
+a2wsgi (which serves the Flask app).
+    pip install quart httpx uvicorn a2wsgi
+
+Run with:
+    uvicorn asgi:application --host 0.0.0.0 --port 5050
+"""
+import asyncio
+import itertools
+import os
+import random
+from urllib.parse import urlsplit
+
+import httpx
+from a2wsgi import WSGIMiddleware
+from quart import Quart, jsonify, make_response, request
+
+import app as core
+
+# Configuration
+ASYNC_HOST_CONCURRENCY = int(os.environ.get('ASYNC_HOST_CONCURRENCY', 1000))
+ASYNC_POOL_SIZE = int(os.environ.get('ASYNC_POOL_SIZE', 1024))
+ASYNC_POOL_SHARD_SIZE = int(os.environ.get('ASYNC_POOL_SHARD_SIZE', 32))
+WSGI_THREADS = int(os.environ.get('WSGI_THREADS', 32))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+CACHES_BLOCK = core.CACHE_REDIS_URL is not None
+ALERTS_BLOCK = core.TRACKING_REDIS_URL is not None  # Logged alerts are relayed through Redis
+
+quart_app = Quart(__name__)
+
+class AsyncUpstreamClient:
+    """Non-blocking counterpart of app.UpstreamClient.
+
+    Same User-Agent, timeout and retry policy, with an asyncio semaphore per
+    host instead of a thread semaphore.
+
+    httpcore scans every pooled connection for every waiting request, which
+    turns quadratic with a thousand requests in flight, so the pool is split
+    into shards of `shard_size` connections used round-robin. The clients are
+    created on first use so they bind to the serving event loop.
+    """
+
+    def __init__(self, pool_size, shard_size, host_concurrency, retries, timeout):
+        self.pool_size = pool_size
+        self.shard_size = shard_size
+        self.host_concurrency = host_concurrency
+        self.retries = retries
+        self.timeout = timeout
+        self.clients = []
+        self.next_client = None
+        self.host_slots = {}
+
+    def _client(self):
+        if not self.clients:
+            limits = httpx.Limits(max_connections=self.shard_size, max_keepalive_connections=self.shard_size)
+            self.clients = [httpx.AsyncClient(headers={'User-Agent': core.USER_AGENT}, timeout=self.timeout, limits=limits)
+                            for _ in range(max(1, -(-self.pool_size // self.shard_size)))]
+            self.next_client = itertools.cycle(self.clients)
+        return next(self.next_client)
+
+    def _slots(self, host):
+        slots = self.host_slots.get(host)
+        if slots is None:
+            slots = self.host_slots[host] = asyncio.Semaphore(self.host_concurrency)
+        return slots
+
+    async def get(self, url, params=None, headers=None, timeout=None, retry=True):
+        retries = self.retries if retry else 0
+        async with self._slots(urlsplit(url).netloc):
+            for attempt in range(retries + 1):
+                last_try = attempt == retries
+                try:
+                    response = await self._client().get(url, params=params, headers=headers,
+                                                        timeout=timeout or self.timeout)
+                except httpx.TransportError:
+                    if last_try:
+                        raise
+                else:
+                    if response.status_code not in RETRY_STATUSES or last_try:
+                        return response
+                # Jittered exponential backoff, as urllib3's Retry does for the sync client
+                await asyncio.sleep(0.3 * 2 ** attempt + random.uniform(0, 0.2))
+
+    async def close(self):
+        clients, self.clients = self.clients, []
+        for client in clients:
+            await client.aclose()
+
+upstream = AsyncUpstreamClient(ASYNC_POOL_SIZE, ASYNC_POOL_SHARD_SIZE, ASYNC_HOST_CONCURRENCY,
+                               core.UPSTREAM_RETRIES, core.UPSTREAM_TIMEOUT)
+
+class AsyncSingleFlight:
+    """Collapse concurrent coroutines for the same key into one task"""
+
+    def __init__(self):
+        self.calls = {}  # {key: Task}
+
+    async def do(self, key, fn):
+        task = self.calls.get(key)
+        if task is None:
+            task = self.calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self.calls.pop(key, None))
+        # A caller that gives up must not cancel the lookup for everyone else
+        return await asyncio.shield(task)
+
+geocode_flights = AsyncSingleFlight()
+wiki_flights = AsyncSingleFlight()
+
+async def maybe_in_thread(blocking, fn, *args):
+    """Call fn, on a worker thread when it may block on I/O"""
+    if blocking:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+@quart_app.after_serving
+async def close_upstream():
+    await upstream.close()
+
+# Weather
+
+@quart_app.route('/api/weather')
+async def get_weather():
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+
+    if not lat or not lng:
+        return jsonify({'error': 'Latitude and longitude required'}), 400
+
+    try:
+        cache_key = core.weather_cache_key(lat, lng)
+        data = await maybe_in_thread(CACHES_BLOCK, core.weather_cache.get, cache_key)
+        if data is None:
+            response = await upstream.get(core.WEATHER_API_URL, params=core.weather_params(lat, lng))
+            data = response.json()
+            if 'current' in data:
+                await maybe_in_thread(CACHES_BLOCK, core.weather_cache.set, cache_key, data)
+
+        if 'current' in data:
+            # Building the response may log a weather alert
+            return jsonify(await maybe_in_thread(ALERTS_BLOCK, core.build_weather_data, data))
+        else:
+            return jsonify({'error': 'Weather data not available'}), 404
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Wikipedia
+
+async def get_wikipedia_info(location_name):
+    """Get Wikipedia page information, sharing app.py's on-disk cache"""
+    key = core.wikipedia_info_key(location_name)
+    value = await asyncio.to_thread(core.wiki_cache.cached, key, lambda: core.fetch_wikipedia_info(location_name))
+    if value is None:
+        value = await wiki_flights.do(key, lambda: load_wikipedia(key, fetch_wikipedia_info(location_name)))
+    return value
+
+async def get_wikipedia_attractions(location):
+    """Get tourist attractions for a location, sharing app.py's on-disk cache"""
+    key = core.wikipedia_attractions_key(location)
+    value = await asyncio.to_thread(core.wiki_cache.cached, key, lambda: core.fetch_wikipedia_attractions(location))
+    if value is None:
+        value = await wiki_flights.do(key, lambda: load_wikipedia(key, fetch_wikipedia_attractions(location)))
+    return value or []
+
+async def load_wikipedia(key, fetch):
+    return await asyncio.to_thread(core.wiki_cache.store, key, await fetch)
+
+async def fetch_wikipedia_info(location_name):
+    """Summary for a location, falling back to the top search hit"""
+    try:
+        clean_name = location_name.split(',')[0].strip()
+
+        response = await upstream.get(core.wikipedia_summary_url(clean_name))
+        if response.status_code == 200:
+            return core.build_wikipedia_info(response.json(), clean_name)
+        else:
+            search_response = await upstream.get(core.wikipedia_title_search_url(clean_name))
+            if search_response.status_code == 200:
+                found_title = core.first_search_title(search_response.json())
+                if found_title:
+                    summary_response = await upstream.get(core.wikipedia_summary_url(found_title))
+                    if summary_response.status_code == 200:
+                        return core.build_wikipedia_info(summary_response.json(), found_title)
+
+        return None
+    except Exception as e:
+        print(f"Wikipedia API error: {e}")
+        return None
+
+async def fetch_wikipedia_attractions(location):
+    """Run every attraction search at once and merge what answers before the deadline"""
+    try:
+        tasks = [asyncio.ensure_future(search_wikipedia_titles(query))
+                 for query in core.attraction_search_queries(location)]
+        done, pending = await asyncio.wait(tasks, timeout=core.WIKI_ATTRACTIONS_DEADLINE)
+        for task in pending:
+            task.cancel()
+
+        title_lists = [task.result() if task in done and task.exception() is None else None
+                       for task in tasks]
+        return core.attractions_result(location, title_lists)
+    except Exception as e:
+        print(f"Wikipedia attractions error: {e}")
+        return []
+
+async def search_wikipedia_titles(query):
+    response = await upstream.get(core.wikipedia_opensearch_url(query))
+    if response.status_code == 200:
+        return response.json()[1]
+    return None
+
+@quart_app.route('/api/tourist-attractions')
+async def get_tourist_attractions():
+    location = request.args.get('location', '')
+    if not location:
+        return jsonify({'error': 'Location parameter required'}), 400
+
+    attractions = await get_wikipedia_attractions(location)
+    if attractions:
+        return jsonify({'attractions': attractions})
+    else:
+        return jsonify({'attractions': [], 'message': 'No tourist attractions found'})
+
+# Search
+
+# Lookups left running past their deadline, kept referenced until they finish
+background_tasks = set()
+
+def run_in_background(coro):
+    task = asyncio.ensure_future(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+async def geocode(query):
+    """Nominatim results for a query, sharing app.py's cache and rate limit"""
+    key = core.normalize_location(query)
+    data = await maybe_in_thread(CACHES_BLOCK, core.geocode_cache.get, key)
+    if data is None:
+        data = await geocode_flights.do(key, lambda: fetch_geocode(query, key))
+    return data
+
+async def fetch_geocode(query, key):
+    delay = core.nominatim_limiter.reserve(core.NOMINATIM_MAX_QUEUE_SECONDS)
+    if delay is None:
+        raise core.GeocoderBusy('Geocoding service is busy, please try again shortly')
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+    # One attempt per slot: retries inside the client would skip the rate limit
+    response = await upstream.get(core.NOMINATIM_API_URL, params=core.geocode_params(query), retry=False)
+    core.check_geocode_throttling(response)
+    data = response.json()
+    await maybe_in_thread(CACHES_BLOCK, core.cache_geocode, key, data)
+    return data
+
+@quart_app.route('/api/search')
+async def search_location():
+    query = request.args.get('q', '')
+    if not query:
+        return jsonify({'error': 'Search query required'}), 400
+
+    try:
+        # Look up Wikipedia page information while geocoding
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        wiki_task = run_in_background(get_wikipedia_info(query))
+
+        data = await geocode(query)
+
+        if data:
+            location_data = core.build_location_data(data[0])
+
+            # Wikipedia only gets until the soft deadline; a late answer
+            # still lands in the cache for the next search
+            try:
+                wiki_data = await asyncio.wait_for(asyncio.shield(wiki_task),
+                                                   timeout=max(0, started + core.WIKI_SEARCH_DEADLINE - loop.time()))
+            except Exception:
+                wiki_data = None
+            if wiki_data:
+                location_data['wikipedia'] = wiki_data
+
+            return jsonify(location_data)
+        else:
+            return jsonify({'error': 'Location not found'}), 404
+
+    except core.GeocoderBusy as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Event stream
+
+@quart_app.route('/api/stream')
+async def stream_events():
+    """Server-sent events without holding a thread per connected client"""
+    try:
+        area = core.stream_area(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    loop = asyncio.get_running_loop()
+    ready = asyncio.Event()
+    stream = core.event_feed.subscribe(core.STREAM_QUEUE_SIZE, area,
+                                       notify=lambda: loop.call_soon_threadsafe(ready.set))
+
+    async def generate():
+        try:
+            yield core.SSE_PREAMBLE
+            while True:
+                try:
+                    await asyncio.wait_for(ready.wait(), core.STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                ready.clear()
+                yield ''.join(core.stream_chunks(stream))
+        finally:
+            core.event_feed.unsubscribe(stream)
+
+    response = await make_response(generate(), 200, core.SSE_HEADERS)
+    response.mimetype = 'text/event-stream'
+    response.timeout = None  # Streams stay open until the client leaves
+    return response
+
+# Dispatch
+
+ASYNC_PATHS = frozenset(['/api/weather', '/api/search', '/api/tourist-attractions', '/api/stream'])
+wsgi_application = WSGIMiddleware(core.app, workers=WSGI_THREADS)
+
+async def application(scope, receive, send):
+    """Send the upstream-bound endpoints to Quart and everything else to Flask"""
+    if scope['type'] == 'lifespan' or scope.get('path') in ASYNC_PATHS:
+        await quart_app(scope, receive, send)
+    else:
+        await wsgi_application(scope, receive, send)
@@ -0,0 +1,124 @@
+"""Load test of /api/weather in sync (gunicorn threads) and async (uvicorn + asgi.py) mode.
+
+Both servers talk to a local stub upstream that answers after a fixed
+delay, and every request uses distinct coordinates so none is served from
+the weather cache. The load generator opens one raw connection per request
+so it stays cheap next to the servers.
+
+Usage: python bench/async_load.py [--requests N] [--concurrency C] [--delay SECONDS]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from common import ROOT, bench_env
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SYNC_THREADS = 32
+
+FORECAST = json.dumps({
+    'latitude': 10.0,
+    'longitude': 20.0,
+    'current': {'temperature_2m': 20, 'apparent_temperature': 20, 'relative_humidity_2m': 50,
+                'wind_speed_10m': 5, 'precipitation': 0, 'weather_code': 0}
+}).encode()
+
+async def stub_app(scope, receive, send):
+    """Upstream stand-in: every request gets a forecast after STUB_DELAY seconds"""
+    if scope['type'] != 'http':
+        return
+    await asyncio.sleep(float(os.environ.get('STUB_DELAY', 0.2)))
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', b'application/json')]})
+    await send({'type': 'http.response.body', 'body': FORECAST})
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start(command, env, port):
+    process = subprocess.Popen(command, env={**os.environ, **env}, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{command[2]} did not start on port {port}")
+
+async def fetch(port, path):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return response.split(b' ', 2)[1]
+
+async def load(port, count, concurrency):
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i):
+        nonlocal errors
+        async with slots:
+            started = time.perf_counter()
+            try:
+                status = await fetch(port, f"/api/weather?lat={10 + i * 0.05:.4f}&lng={20 + i * 0.05:.4f}")
+            except OSError:
+                status = None
+            latencies.append(time.perf_counter() - started)
+            if status != b'200':
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)], errors
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=500)
+    parser.add_argument('--delay', type=float, default=0.2, help='stub upstream latency in seconds')
+    args = parser.parse_args()
+
+    stub_port = free_port()
+    stub = start([sys.executable, '-m', 'uvicorn', '--app-dir', BENCH_DIR, 'async_load:stub_app',
+                  '--port', str(stub_port), '--log-level', 'warning'],
+                 {'STUB_DELAY': str(args.delay)}, stub_port)
+    env = bench_env(WEATHER_API_URL=f'http://127.0.0.1:{stub_port}/forecast')
+    modes = {
+        'sync': [sys.executable, '-m', 'gunicorn', '--chdir', ROOT, '--workers', '1',
+                 '--threads', str(SYNC_THREADS), '--log-level', 'warning', 'app:app'],
+        'async': [sys.executable, '-m', 'uvicorn', '--app-dir', ROOT, 'asgi:application',
+                  '--log-level', 'warning'],
+    }
+    try:
+        for mode, command in modes.items():
+            port = free_port()
+            bind = ['--bind', f'127.0.0.1:{port}'] if mode == 'sync' else ['--port', str(port)]
+            server = start(command + bind, env, port)
+            try:
+                elapsed, p50, p99, errors = asyncio.run(load(port, args.requests, args.concurrency))
+            finally:
+                server.terminate()
+                server.wait()
+            print(f"{mode:>5}  {args.requests} requests, {args.concurrency} concurrent, "
+                  f"{args.delay}s upstream: {args.requests / elapsed:6.0f} req/s  "
+                  f"p50 {p50:.2f}s  p99 {p99:.2f}s  errors {errors}")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Check the shared-tracking mode (TRACKING_REDIS_URL) with two workers on fakeredis.
+
+Loads app.py twice as two worker processes would, both pointed at one
+in-memory fakeredis server, and checks that locations, hotspots, joins,
+leader hand-over and expiry are shared between them.
+
+Usage: python bench/check_shared_tracking.py   (needs: pip install fakeredis)
+"""
+import importlib.util
+import os
+import time
+
+import fakeredis
+import redis
+
+from common import ROOT, bench_env
+
+server = fakeredis.FakeServer()
+redis.Redis.from_url = classmethod(lambda cls, url, **kwargs: fakeredis.FakeRedis(server=server, **kwargs))
+
+def load_worker(name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, 'app.py'))
+    worker = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(worker)
+    return worker
+
+def eventually(check, timeout=5.0):
+    """Wait for another worker's publish to arrive"""
+    deadline = time.monotonic() + timeout
+    while not check():
+        assert time.monotonic() < deadline, 'timed out waiting for hotspot sync'
+        time.sleep(0.05)
+
+def hotspot_members(client):
+    return [sorted(t['user_id'] for t in h['tourists']) for h in client.get('/api/hotspots').get_json()['hotspots']]
+
+def ping(client, user_id, lat, lng):
+    response = client.post('/api/behavior', json={'user_id': user_id, 'lat': lat, 'lng': lng, 'name': user_id})
+    assert response.status_code == 200, response.get_json()
+
+def main():
+    os.environ.update(bench_env(TRACKING_REDIS_URL='redis://fakeredis'))
+    first, second = load_worker('worker_1'), load_worker('worker_2')
+    client_1, client_2 = first.app.test_client(), second.app.test_client()
+
+    # Locations reported to either worker land in one shared store and geo index
+    ping(client_1, 'u1', 48.8584, 2.2945)
+    ping(client_1, 'u2', 48.8586, 2.2947)
+    ping(client_2, 'u3', 48.8582, 2.2943)
+    assert len(first.tourist_locations) == len(second.tourist_locations) == 3
+    assert sorted(first.tourist_grid.nearby(48.8584, 2.2945, 0.5)) == ['u1', 'u2', 'u3']
+
+    # One worker takes the lease and clusters everyone; the other gets its result
+    second.hotspot_scheduler.run_pass()
+    first.hotspot_scheduler.run_pass()
+    assert second.hotspot_sync.leading and not first.hotspot_sync.leading
+    eventually(lambda: hotspot_members(client_1) == [['u1', 'u2', 'u3']])
+    print('hotspot formed by the leader is served by both workers')
+
+    # A join on the follower is queued for the leader
+    hotspot_id = client_1.get('/api/hotspots').get_json()['hotspots'][0]['id']
+    assert client_1.post(f'/api/hotspots/join/{hotspot_id}', json={'user_id': 'u4', 'name': 'u4'}).get_json()['success']
+    second.hotspot_scheduler.run_pass()
+    eventually(lambda: hotspot_members(client_1) == [['u1', 'u2', 'u3', 'u4']])
+    print('join on the follower is applied by the leader')
+
+    # When the lease lapses the other worker takes over from the shared hotspots
+    fakeredis.FakeRedis(server=server, decode_responses=True).delete('tracking:leader')
+    first.hotspot_scheduler.run_pass()
+    assert first.hotspot_sync.leading and len(first.hotspots) == 1
+    ping(client_2, 'u1', 48.90, 2.40)  # u1 walks away, reported to the follower
+    first.hotspot_scheduler.run_pass()
+    second.hotspot_scheduler.run_pass()
+    assert not second.hotspot_sync.leading
+    eventually(lambda: hotspot_members(client_2) == [['u2', 'u3', 'u4']])
+    print('new leader picks up moves reported to the old one')
+
+    # Expiry through the shared sorted set clears both workers' view
+    later = time.time() + first.TRACKING_TTL_SECONDS + 1
+    with first.hotspot_lock:
+        first.forget_tourists(first.tourist_locations.expire(now=later))
+    assert len(second.tourist_locations) == 0 and len(first.tourist_grid) == 0
+    print('expired tourists leave the shared store and geo index')
+    print('OK')
+
+if __name__ == '__main__':
+    main()
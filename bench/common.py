@@ -0,0 +1,39 @@
+"""Shared setup for the benchmark scripts.
+
+Each script imports app.py in-process with in-memory storage, a throwaway
+Wikipedia cache and background hotspot passes held off, so timings only
+cover the code being measured.
+"""
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def bench_env(**overrides):
+    """Environment for an isolated app.py, as used in-process and by spawned servers"""
+    scratch = tempfile.mkdtemp(prefix='trip-maker-bench-')
+    env = {
+        'STORAGE_BACKEND': 'memory',
+        'WIKI_CACHE_PATH': os.path.join(scratch, 'wiki_cache.sqlite3'),
+        'HOTSPOT_REFRESH_SECONDS': '3600',
+        'HOTSPOT_DIRTY_LIMIT': str(10 ** 9),
+    }
+    env.update(overrides)
+    return env
+
+def load_app(**overrides):
+    """Import app.py with bench_env() applied"""
+    os.environ.update(bench_env(**overrides))
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    import app
+    return app
+
+def per_call(fn, count):
+    """Average seconds per call of fn() over `count` calls"""
+    started = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter() - started) / count
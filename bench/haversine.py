@@ -0,0 +1,46 @@
+"""Scalar calculate_distance loop vs the vectorized haversine_km kernel.
+
+Usage: python bench/haversine.py
+"""
+import time
+
+import numpy as np
+
+from common import load_app
+
+SIZES = (10 ** 4, 10 ** 5, 10 ** 6)
+
+def pairwise_haversine_km(app, lats1, lngs1, lats2, lngs2):
+    """Matrix of distances in kilometers between two sets of points, broadcast through haversine_km"""
+    lats1 = np.asarray(lats1, dtype=np.float64)[:, np.newaxis]
+    lngs1 = np.asarray(lngs1, dtype=np.float64)[:, np.newaxis]
+    return app.haversine_km(lats1, lngs1, lats2, lngs2)
+
+def main():
+    app = load_app()
+    rng = np.random.default_rng(5)
+    for size in SIZES:
+        lats = rng.uniform(-60, 60, size)
+        lngs = rng.uniform(-180, 180, size)
+        lat_list, lng_list = lats.tolist(), lngs.tolist()
+
+        started = time.perf_counter()
+        scalar = [app.calculate_distance(10.0, 20.0, lat, lng) for lat, lng in zip(lat_list, lng_list)]
+        scalar_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        vectorized = app.haversine_km(10.0, 20.0, lats, lngs)
+        vector_seconds = time.perf_counter() - started
+
+        assert np.allclose(scalar, vectorized)
+        print(f"{size:>8} points  scalar {size / scalar_seconds / 1e6:6.2f} M/s  "
+              f"vectorized {size / vector_seconds / 1e6:7.2f} M/s  x{scalar_seconds / vector_seconds:.0f}")
+
+    # Many against many
+    lats, lngs = rng.uniform(-60, 60, 1000), rng.uniform(-180, 180, 1000)
+    started = time.perf_counter()
+    matrix = pairwise_haversine_km(app, lats, lngs, lats, lngs)
+    print(f"pairwise {matrix.shape[0]}x{matrix.shape[1]}  {(time.perf_counter() - started) * 1e3:.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Cost of one /api/behavior location ping with 1k, 10k and 100k tourists tracked.
+
+A ping records the location and queues the tourist; the hotspot scheduler
+later updates only that tourist's hotspots. Both halves are timed per ping,
+along with the fixed cost of a scheduler pass (expiry and change reports)
+that is shared by every ping it picks up. The all-pairs scan that
+clustering used to run on every ping is timed where it finishes in
+reasonable time.
+
+Usage: python bench/hotspot_pings.py [tourists ...]
+"""
+import random
+import subprocess
+import sys
+import time
+
+from common import load_app, per_call
+
+SIZES = (1000, 10000, 100000)
+CITIES = 50
+PINGS = 500
+ALL_PAIRS_MAX = 2000
+
+def all_pairs_scan(app, locations):
+    """Distance check between every pair of tourists, as clustering did before the grid"""
+    close = 0
+    for lat, lng in locations:
+        for other_lat, other_lng in locations:
+            if app.calculate_distance(lat, lng, other_lat, other_lng) <= app.HOTSPOT_RADIUS_KM:
+                close += 1
+    return close
+
+def run(size):
+    app = load_app()
+    rng = random.Random(size)
+    cities = [(rng.uniform(-50, 60), rng.uniform(-120, 140)) for _ in range(CITIES)]
+
+    def near_city():
+        lat, lng = rng.choice(cities)
+        return lat + rng.uniform(-0.05, 0.05), lng + rng.uniform(-0.05, 0.05)
+
+    locations = [near_city() for _ in range(size)]
+    app.update_tourist_locations([(f"tourist_{i}", lat, lng, 'Bench') for i, (lat, lng) in enumerate(locations)])
+    app.hotspot_scheduler.run_pass()
+
+    moved = []
+
+    def ping():
+        user_id = f"tourist_{rng.randrange(size)}"
+        lat, lng = near_city()
+        app.update_tourist_location(user_id, lat, lng, 'Bench')
+        moved.append(user_id)
+
+    def update_hotspots():
+        with app.hotspot_lock:
+            app.update_hotspots_for(moved.pop())
+
+    ping_seconds = per_call(ping, PINGS)
+    update_seconds = per_call(update_hotspots, PINGS)
+    app.hotspot_scheduler.run_pass()
+    pass_seconds = per_call(app.hotspot_scheduler.run_pass, 20)
+    line = (f"{size:>7} tourists  ping {ping_seconds * 1e3:6.3f} ms  "
+            f"hotspot update {update_seconds * 1e3:6.3f} ms  "
+            f"pass overhead {pass_seconds * 1e3:7.3f} ms ({len(app.hotspots)} hotspots)")
+    if size <= ALL_PAIRS_MAX:
+        started = time.perf_counter()
+        all_pairs_scan(app, locations)
+        line += f"  all-pairs scan {(time.perf_counter() - started) * 1e3:9.1f} ms"
+    print(line, flush=True)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        for size in sys.argv[1:]:
+            run(int(size))
+    else:
+        # A fresh process per size so tracked state and hotspots start empty
+        for size in SIZES:
+            subprocess.run([sys.executable, __file__, str(size)], check=True)
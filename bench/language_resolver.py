@@ -0,0 +1,68 @@
+"""LanguageResolver lookups vs the old linear partial-match loop.
+
+The corpus is shaped like Nominatim display names ("City, Region, Country"),
+plus the short typed queries the search box sends.
+
+Usage: python bench/language_resolver.py
+"""
+import random
+
+from common import load_app, per_call
+
+LOOKUPS = 20000
+
+OTHER_PLACES = [
+    'Chicago, Cook County, Illinois, United States',
+    'Toronto, Golden Horseshoe, Ontario, Canada',
+    'Kyoto, Kyoto Prefecture, Japan',
+    'Lyon, Métropole de Lyon, Auvergne-Rhône-Alpes, France métropolitaine, France',
+    'Munich, Bavaria, Germany',
+    'Florence, Tuscany, Italy',
+    'Seville, Andalusia, Spain',
+    'Cusco, Peru',
+    'Reykjavík, Capital Region, Iceland',
+    'Ontario, San Bernardino County, California, United States',
+    'Kochi, Ernakulam, Kerala, 682001, India',
+    'Marrakesh, Marrakesh-Safi, Morocco',
+    'Hanoi, Vietnam',
+    'Lagos, Lagos State, Nigeria',
+    'São Paulo, Região Imediata de São Paulo, Região Sudeste, Brasil',
+]
+TYPED = ['del', 'kuala', 'hong', 'usa', 'japan', 'Rio', 'marathi', 'new york', 'paris']
+
+def linear_language(app, location_name):
+    """The lookup LanguageResolver replaced: alias tables rebuilt per call, then substring scans"""
+    aliases = dict(app.LOCATION_ALIASES)
+    keywords = dict(app.LANGUAGE_KEYWORDS)
+    location = location_name.lower().strip()
+    location = aliases.get(location, location)
+    if location in app.LOCAL_LANGUAGES:
+        return app.LOCAL_LANGUAGES[location]
+    for key, data in app.LOCAL_LANGUAGES.items():
+        if key in location or location in key:
+            return data
+    for keyword, city in keywords.items():
+        if keyword in location:
+            return app.LOCAL_LANGUAGES[city]
+    return dict(app.DEFAULT_LANGUAGE)
+
+def main():
+    app = load_app()
+    rng = random.Random(21)
+    corpus = [f"{city.title()}, {city.title()} District, Some Region, Some Country" for city in app.LOCAL_LANGUAGES]
+    corpus += OTHER_PLACES + TYPED
+    workload = [rng.choice(corpus) for _ in range(LOOKUPS)]
+
+    for label, names in (('mixed corpus', workload), ('no city match', OTHER_PLACES)):
+        lookups = iter(names * (LOOKUPS // len(names) + 1))
+        linear = per_call(lambda: linear_language(app, next(lookups)), LOOKUPS)
+        lookups = iter(names * (LOOKUPS // len(names) + 1))
+        indexed = per_call(lambda: app.get_location_language(next(lookups)), LOOKUPS)
+        print(f"{label:>14}  linear {linear * 1e6:6.1f} us/lookup  resolver {indexed * 1e6:6.1f} us/lookup")
+
+    tables = {**app.LOCATION_ALIASES, **app.LANGUAGE_KEYWORDS}
+    build = per_call(lambda: app.LanguageResolver(app.LOCAL_LANGUAGES, tables, app.DEFAULT_LANGUAGE), 10)
+    print(f"resolver build {build * 1e3:.1f} ms at startup")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Nearby-average latency for /api/ratings?lat=..&lng=..&radius=5 vs rating count.
+
+Times the k-d tree radius query against a linear vectorized scan, and the
+whole request through Flask's test client.
+
+Usage: python bench/rating_radius.py
+"""
+import numpy as np
+
+from common import load_app, per_call
+
+SIZES = (10 ** 4, 10 ** 5, 10 ** 6)
+CITIES = 200
+QUERIES = 200
+
+def main():
+    app = load_app()
+    client = app.app.test_client()
+    rng = np.random.default_rng(7)
+    cities = np.column_stack((rng.uniform(-50, 60, CITIES), rng.uniform(-120, 140, CITIES)))
+
+    def near_cities(count):
+        picked = cities[rng.integers(0, CITIES, count)]
+        return picked + rng.normal(0, 0.1, picked.shape)
+
+    for size in SIZES:
+        for lat, lng in near_cities(size - len(app.ratings)):
+            app.ratings.append(lat, lng, int(rng.integers(1, 6)))
+        queries = iter(near_cities(QUERIES * 3).tolist())
+        app.ratings.within(0.0, 0.0, 5)  # Builds the tree once
+
+        def indexed():
+            lat, lng = next(queries)
+            app.ratings.within(lat, lng, 5)
+
+        def linear():
+            lat, lng = next(queries)
+            lats, lngs, _, _ = app.ratings.columns()
+            np.flatnonzero(app.haversine_km(lat, lng, lats, lngs) <= 5)
+
+        def request():
+            lat, lng = next(queries)
+            assert client.get(f'/api/ratings?lat={lat}&lng={lng}&radius=5').status_code == 200
+
+        print(f"{size:>8} ratings  k-d tree {per_call(indexed, QUERIES) * 1e3:7.3f} ms  "
+              f"linear scan {per_call(linear, QUERIES) * 1e3:7.3f} ms  "
+              f"request {per_call(request, QUERIES) * 1e3:7.3f} ms")
+
+if __name__ == '__main__':
+    main()
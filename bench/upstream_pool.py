@@ -0,0 +1,61 @@
+"""Bare requests.get vs the pooled keep-alive UpstreamClient against a local stub server.
+
+The real upstreams are HTTPS, where a fresh connection also costs a TLS
+handshake; pass a certificate to serve the stub over TLS, e.g. one made with
+    openssl req -x509 -newkey rsa:2048 -nodes -subj /CN=localhost \\
+        -keyout key.pem -out cert.pem
+
+Usage: python bench/upstream_pool.py [--requests N] [--cert cert.pem --key key.pem]
+"""
+import argparse
+import os
+import ssl
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from common import load_app, per_call
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real upstreams
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = b'{"ok": 1}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--cert')
+    parser.add_argument('--key')
+    args = parser.parse_args()
+
+    app = load_app()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    scheme = 'http'
+    if args.cert:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(args.cert, args.key)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = 'https'
+        os.environ['REQUESTS_CA_BUNDLE'] = args.cert  # Trusted by both clients
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'{scheme}://localhost:{server.server_port}/forecast'
+
+    bare = per_call(lambda: requests.get(url, timeout=5).json(), args.requests)
+    pooled = per_call(lambda: app.upstream.get(url).json(), args.requests)
+    print(f"{args.requests} {scheme} requests  bare requests.get {bare * 1e3:.3f} ms/req  "
+          f"pooled {pooled * 1e3:.3f} ms/req  x{bare / pooled:.1f}")
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()